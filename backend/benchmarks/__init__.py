@@ -0,0 +1,2 @@
+"""Runnable performance benchmarks. Run from the backend directory, e.g.
+``python -m benchmarks.heikin_ashi``."""
@@ -0,0 +1,139 @@
+"""End-to-end API load test of the FastAPI app against the offline fake exchange.
+
+Runs main.app in-process through httpx's ASGI transport with
+EXCHANGE_BACKEND=fake, so no network or API keys are needed. Virtual users
+replay the dashboard's polling mix at the chosen concurrency. The run reports
+p50/p95/p99 latency and requests per second for each endpoint.
+
+    python -m benchmarks.api_load --concurrency 16 --duration 30
+    python -m benchmarks.api_load --latency-ms 40 --jitter-ms 20 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Dashboard polling mix: (method, path, relative weight)
+DEFAULT_MIX = {
+    "market-data": ("GET", "/api/market-data", 4),
+    "current-price": ("GET", "/api/current-price", 4),
+    "key-levels": ("GET", "/api/key-levels", 2),
+    "trades": ("GET", "/api/trades", 2),
+    "status": ("GET", "/api/status", 2),
+    "polynomial-predictions": ("GET", "/api/polynomial-predictions", 1),
+}
+
+
+def configure_exchange(args):
+    """Point connect() at the fake exchange before the app starts."""
+    os.environ["EXCHANGE_BACKEND"] = "fake"
+    os.environ["FAKE_EXCHANGE_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_EXCHANGE_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_EXCHANGE_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_EXCHANGE_SEED"] = str(args.seed)
+
+
+async def virtual_user(client, mix, params, deadline, rng, samples):
+    names = list(mix)
+    weights = [mix[name][2] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, _ = mix[name]
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, params=params)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        samples[name].append((time.perf_counter() - start, ok))
+
+
+def summarize(samples, elapsed: float) -> dict:
+    summary = {}
+    everything = []
+    for name, rows in sorted(samples.items()):
+        everything += rows
+        summary[name] = _stats(rows, elapsed)
+    summary["all"] = _stats(everything, elapsed)
+    return summary
+
+
+def _stats(rows, elapsed: float) -> dict:
+    latencies = np.array([latency for latency, _ in rows]) * 1e3
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {"requests": len(rows), "errors": sum(not ok for _, ok in rows),
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "requests_per_second": len(rows) / elapsed}
+
+
+async def run(args) -> dict:
+    import httpx
+    import main
+
+    await main.startup_event()
+    mix = {name: DEFAULT_MIX[name] for name in args.endpoints}
+    params = {"pair": args.pair, "timeframe": args.timeframe, "periods": args.periods}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        for _ in range(args.open_trades):
+            await client.post("/api/trade", json={"pair": args.pair, "size": 1000, "direction": "BUY"})
+
+        # Warm up buffers and caches before measuring
+        warmup = defaultdict(list)
+        await asyncio.gather(*(virtual_user(client, mix, params, time.perf_counter() + args.warmup,
+                                            random.Random(args.seed + 1000 + i), warmup)
+                               for i in range(args.concurrency)))
+
+        samples = defaultdict(list)
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, mix, params, start + args.duration,
+                                            random.Random(args.seed + i), samples)
+                               for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = (await client.get("/api/stats")).json()
+
+    return {"concurrency": args.concurrency, "duration": elapsed, "exchange_latency_ms": args.latency_ms,
+            "exchange_jitter_ms": args.jitter_ms, "exchange_error_rate": args.error_rate,
+            "endpoints": summarize(samples, elapsed), "server_stats": stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8, help="virtual users polling at once")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the run")
+    parser.add_argument("--endpoints", nargs="+", default=list(DEFAULT_MIX), choices=list(DEFAULT_MIX))
+    parser.add_argument("--pair", default="GBP_USD")
+    parser.add_argument("--timeframe", default="M5")
+    parser.add_argument("--periods", type=int, default=48)
+    parser.add_argument("--open-trades", type=int, default=2, help="trades opened before the run")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fake exchange delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random fake exchange delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failing exchange requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    configure_exchange(args)
+    report = asyncio.run(run(args))
+
+    print(f"{'endpoint':<24} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for name, s in report["endpoints"].items():
+        print(f"{name:<24} {s['requests']:>9} {s['errors']:>7} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+              f"{s['p99_ms']:>9.2f} {s['requests_per_second']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
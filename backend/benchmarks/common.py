@@ -0,0 +1,30 @@
+import time
+import numpy as np
+
+
+def random_candles(n: int, seed: int = 0) -> np.ndarray:
+    """Random-walk candles in the 7-row parse_prices layout."""
+    rng = np.random.default_rng(seed)
+    close = 1.25 + np.cumsum(rng.normal(0, 2e-4, n))
+    open_p = np.concatenate([close[:1], close[:-1]])
+    high = np.maximum(open_p, close) + rng.random(n) * 2e-4
+    low = np.minimum(open_p, close) - rng.random(n) * 2e-4
+    volume = rng.integers(1, 500, n).astype(float)
+    d_time = (np.arange(n) * 5 // 60 % 24) + (np.arange(n) * 5 % 60) / 100
+    dow = (np.arange(n) * 5 // (60 * 24)) % 5
+    return np.vstack([open_p, close, high, low, volume, d_time, dow])
+
+
+def best_time(fn, *args, repeat: int = 5, **kwargs) -> float:
+    """Best wall-clock time in seconds over `repeat` calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, n: int, before: float, after: float):
+    print(f"{name:<28} N={n:<8} before {before * 1e3:9.3f} ms   "
+          f"after {after * 1e3:9.3f} ms   speedup {before / after:7.1f}x")
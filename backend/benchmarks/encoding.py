@@ -0,0 +1,62 @@
+"""Response encoding: the previous JSON path vs NumpyJSONResponse.
+
+Builds /api/market-data (classic and zero_lag) and /api/key-levels responses
+from synthetic candles and times the work from the finished response to the
+HTTP body. Every run asserts that both paths produce identical bytes before
+timing them.
+"""
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from libs.synthetic import generate_candles
+from services.base_service import BaseService
+from services.data_service import DataService
+from services.encoding import NumpyJSONResponse
+from .common import best_time, report
+
+
+def _lists(obj):
+    """Arrays as lists, the way the services converted them: tolist(), zl NaN -> None, bool -> int."""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == bool:
+            return obj.astype(int).tolist()
+        return np.where(np.isfinite(obj), obj, None).tolist() if obj.dtype.kind == "f" else obj.tolist()
+    if isinstance(obj, dict):
+        return {k: _lists(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_lists(item) for item in obj]
+    return obj
+
+
+def encode_before(response) -> bytes:
+    """tolist() in the service, convert_numpy_to_json in create_response, jsonable_encoder in FastAPI."""
+    content = BaseService.convert_numpy_to_json(_lists(response))
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def encode_after(response) -> bytes:
+    return NumpyJSONResponse(response).body
+
+
+def responses(periods: int) -> dict:
+    service = DataService(None)
+    data = generate_candles(max(periods + 100, 200), seed=0)
+    windows = [3, 12, 24, 36, 48]
+    return {
+        "market-data": service._market_data(data, "GBP_USD", "M5", periods, windows, "classic", 70, 5),
+        "market-data zero_lag": service._market_data(data, "GBP_USD", "M5", periods, windows, "zero_lag", 70, 5),
+        "key-levels": service._key_levels(data, "GBP_USD", "M5", periods, data.shape[1], 20, 0.001),
+    }
+
+
+def main():
+    for periods, repeat in ((48, 50), (500, 10), (2000, 5)):
+        for name, response in responses(periods).items():
+            assert encode_before(response) == encode_after(response), name
+            report(name, periods,
+                   best_time(encode_before, response, repeat=repeat),
+                   best_time(encode_after, response, repeat=repeat))
+
+
+if __name__ == "__main__":
+    main()
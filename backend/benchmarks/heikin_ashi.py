@@ -0,0 +1,28 @@
+"""Heikin-Ashi: per-candle update_HA loop vs the vectorized heikin_ashi kernel."""
+import numpy as np
+from libs.indicators import update_HA, calc_HA, heikin_ashi
+from .common import random_candles, best_time, report
+
+
+def calc_HA_loop(prices):
+    """The previous calc_HA implementation, kept as the reference."""
+    HA = np.zeros((5, prices.shape[1]))
+    HA[:4, 0] = prices[:4, 0]
+    for n in range(1, prices.shape[1]):
+        HA[:, n] = update_HA(HA[:, n - 1], prices[:, n])
+    return HA
+
+
+def main():
+    for n in (48, 4000):
+        prices = random_candles(n)
+        assert np.array_equal(calc_HA(prices), calc_HA_loop(prices))
+        report("calc_HA", n, best_time(calc_HA_loop, prices), best_time(calc_HA, prices))
+
+    stack = np.stack([random_candles(4000, seed) for seed in range(6)])
+    loop = lambda s: [calc_HA_loop(p) for p in s]
+    report("heikin_ashi (6, 7, N)", 4000, best_time(loop, stack), best_time(heikin_ashi, stack))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""parse_prices: per-candle strptime loop vs the columnar parser, on OANDA-style candle dicts."""
+from datetime import datetime, timedelta
+import numpy as np
+from libs.tradelib import parse_prices
+from .common import random_candles, best_time, report
+
+
+def oanda_candles(n: int, seed: int = 0) -> list:
+    """Candle dicts as returned by the InstrumentsCandles endpoint (M5, mid prices)."""
+    prices = random_candles(n, seed)
+    start = datetime(2023, 12, 29, 21, 0)
+    return [{
+        'complete': True,
+        'volume': int(prices[4, i]),
+        'time': (start + timedelta(minutes=5 * i)).strftime('%Y-%m-%dT%H:%M:%S') + '.000000000Z',
+        'mid': {'o': f"{prices[0, i]:.5f}", 'h': f"{prices[2, i]:.5f}",
+                'l': f"{prices[3, i]:.5f}", 'c': f"{prices[1, i]:.5f}"},
+    } for i in range(n)]
+
+
+def parse_prices_loop(candles):
+    """The previous parse_prices implementation, kept as the reference."""
+    npdataset = np.zeros((7, len(candles)))
+    for i in range(len(candles)):
+        str_time = candles[i].get('time')[:19]
+        dow = datetime.strptime(str_time[:10], '%Y-%M-%d').weekday()
+        d_time = float(str_time[11:13]) + float(str_time[14:16]) / 100 + float(str_time[17:19]) / 10000
+        npdataset[:, i] = np.array([candles[i].get('mid')['o'], candles[i].get('mid')['c'], candles[i].get('mid')['h'],
+                                    candles[i].get('mid')['l'], candles[i].get('volume'), d_time, dow]).T
+    return npdataset
+
+
+def main():
+    for n in (500, 50000):
+        candles = oanda_candles(n)
+        fast, slow = parse_prices(candles), parse_prices_loop(candles)
+        assert np.array_equal(fast[:6], slow[:6])
+
+        # The old '%Y-%M-%d' format read the month as minutes, so check weekdays against a correct parse
+        dow = [datetime.strptime(c['time'][:10], '%Y-%m-%d').weekday() for c in candles]
+        assert np.array_equal(fast[6], dow)
+        report("parse_prices", n, best_time(parse_prices_loop, candles, repeat=3), best_time(parse_prices, candles))
+
+
+if __name__ == "__main__":
+    main()
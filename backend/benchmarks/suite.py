@@ -0,0 +1,157 @@
+"""Indicator benchmark suite with JSON results and regression checks.
+
+Times the public functions of libs.indicators on synthetic candles
+(libs.synthetic) at several sizes, reporting best wall time, throughput in
+candles per second and peak traced memory. Results can be written to JSON and
+compared against an earlier run; cases slower than the threshold are flagged
+and make the run exit with status 1.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2
+    python -m benchmarks.suite --sizes 100 4000 --only zlema
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+from libs import indicators as ind
+from libs.synthetic import generate_candles
+
+SIZES = (100, 4000, 100_000, 1_000_000)
+LOOP_MAX_N = 100_000  # Per-candle Python loops are skipped above this size
+ZLEMA_WINDOWS = [5, 8, 13, 21, 34]
+
+# name -> (function of the candles, largest size to run or None). adaptive_momentum
+# is left out: its volume average is shorter than the returns unless period == 2.
+CASES = {
+    "ema": (lambda p: ind.ema(p[1], 20), None),
+    "atr": (lambda p: ind.atr(p[2], p[3], p[1], 14), None),
+    "market_eff": (lambda p: ind.market_eff(p, 14), None),
+    "zlema_ochl": (lambda p: ind.zlema_ochl(p[:4], 20), None),
+    "zlema_ochl_vectorized": (lambda p: ind.zlema_ochl_vectorized(p[:4], 20), None),
+    "zlema_ochl_multi": (lambda p: ind.zlema_ochl_multi(p[:4], ZLEMA_WINDOWS), None),
+    # The per-window loop zlema_ochl_multi replaces; compare with the case above
+    "zlema_ochl per window": (lambda p: [ind.zlema_ochl(p[:4], w) for w in ZLEMA_WINDOWS], None),
+    "ZlemaOCHLState.from_ochl": (lambda p: ind.ZlemaOCHLState.from_ochl(p[:4], 20), None),
+    "zlema_optimized": (lambda p: ind.zlema_optimized(p[1], 20), None),
+    "zlema": (lambda p: ind.zlema(p[1], 1.0, 20), LOOP_MAX_N),
+    "zlema_v2": (lambda p: ind.zlema_v2(p[1], 1.0, 20), LOOP_MAX_N),
+    "calc_HA": (lambda p: ind.calc_HA(p), None),
+    "calc_rsi": (lambda p: ind.calc_rsi(p, 14), None),
+    "vwap": (lambda p: ind.vwap(p[1], p[4]), None),
+    "vpt": (lambda p: ind.vpt(p, p[4], 20), None),
+    "vpt_2": (lambda p: ind.vpt_2(p, p[4]), None),
+    "market_microstructure_features": (lambda p: ind.market_microstructure_features(p, p[4]), None),
+    "aggregate_ha_zlema": (lambda p: ind.aggregate_ha_zlema(p, 5, 20), None),
+    "aggregate_ha_zlema_multi": (lambda p: ind.aggregate_ha_zlema_multi(p, [2, 5, 10], [10, 20, 40]), None),
+    "zero_lag_trend_signals": (lambda p: ind.zero_lag_trend_signals(p[:4], 70, 1.2), None),
+    "detect_support_resistance": (lambda p: ind.detect_support_resistance(p[:4], 20, 0.001), None),
+    "pivot_points": (lambda p: ind.pivot_points(p[:4]), None),
+    "volume_profile_levels": (lambda p: ind.volume_profile_levels(p[1], p[4]), None),
+    "volume_profile_multi": (lambda p: ind.volume_profile_multi(p[1], p[4], [100, 1000, 10000]), None),
+    "VolumeProfile": (lambda p: ind.VolumeProfile(p[1], p[4]).levels(), None),
+    "key_levels_composite": (lambda p: ind.key_levels_composite(p[:4], p[4], 20, 0.001), None),
+}
+
+
+def time_case(fn, prices, repeat: int, min_time: float) -> float:
+    """Best wall time of fn(prices), repeating until min_time has passed (at most `repeat` runs)."""
+    best = float('inf')
+    spent = 0.0
+    runs = 0
+    while runs < repeat and (runs == 0 or spent < min_time):
+        start = time.perf_counter()
+        fn(prices)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+    return best
+
+
+def peak_memory(fn, prices) -> int:
+    """Peak bytes traced while running fn(prices) once (NumPy buffers included)."""
+    tracemalloc.start()
+    try:
+        fn(prices)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, only=None, repeat: int = 20, min_time: float = 0.5, seed: int = 0) -> list:
+    results = []
+    for n in sizes:
+        prices = generate_candles(n, seed=seed)
+        for name, (fn, max_n) in CASES.items():
+            if (only and not any(o in name for o in only)) or (max_n is not None and n > max_n):
+                continue
+            fn(prices)  # warm up
+            seconds = time_case(fn, prices, repeat, min_time)
+            result = {"name": name, "n": n, "seconds": seconds,
+                      "candles_per_second": n / seconds, "peak_bytes": peak_memory(fn, prices)}
+            results.append(result)
+            print(f"{name:<32} N={n:<8} {seconds * 1e3:11.3f} ms  {n / seconds:14,.0f} candles/s  "
+                  f"peak {result['peak_bytes'] / 2 ** 20:9.2f} MiB", flush=True)
+    return results
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Cases whose time grew by more than `threshold` (0.2 = 20%) over the baseline."""
+    before = {(r["name"], r["n"]): r["seconds"] for r in baseline}
+    regressions = []
+    for r in results:
+        old = before.get((r["name"], r["n"]))
+        if old is None:
+            continue
+        ratio = r["seconds"] / old
+        if ratio > 1 + threshold:
+            regressions.append({"name": r["name"], "n": r["n"], "before": old, "after": r["seconds"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--only", nargs="+", help="run cases whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=20, help="maximum timed runs per case")
+    parser.add_argument("--min-time", type=float, default=0.5, help="keep repeating until this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="flag cases slower by more than this fraction")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.only, args.repeat, args.min_time, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.platform(),
+                "seed": args.seed,
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for r in regressions:
+            print(f"SLOWER  {r['name']:<32} N={r['n']:<8} {r['before'] * 1e3:11.3f} ms -> "
+                  f"{r['after'] * 1e3:11.3f} ms  ({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No case slower than the baseline by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
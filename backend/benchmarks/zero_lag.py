@@ -0,0 +1,24 @@
+"""zero_lag_trend_signals: previous loop implementation vs the linear-time version.
+
+The loop version is frozen in tests/test_zero_lag.py, where pytest checks that
+both produce identical output; this script only times them.
+"""
+import os
+import sys
+from libs.indicators import zero_lag_trend_signals
+from .common import random_candles, best_time, report
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from tests.test_zero_lag import zero_lag_trend_signals_loop  # noqa: E402
+
+
+def main():
+    for n, repeat in ((4000, 5), (100_000, 1)):
+        ochl = random_candles(n)[:4]
+        report("zero_lag_trend_signals", n,
+               best_time(zero_lag_trend_signals_loop, ochl, repeat=repeat),
+               best_time(zero_lag_trend_signals, ochl, repeat=repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,22 @@ class Config:
     PIP_MULTIPLIER = 10000
     RSI_WINDOW = 4
     EFFICIENCY_WINDOW = 4
+    PIPELINE_CACHE_SIZE = 64  # Indicator pipelines kept for reuse across endpoints
+    RESPONSE_CACHE_SIZE = 256  # Finished market-data / key-levels responses kept for repeat polls
+
+    # Blocking calls run in a shared thread pool; at most this many at once per dependency.
+    # 'trading' is 1 so open-trade bookkeeping is never updated concurrently.
+    BLOCKING_LIMITS = {
+        'oanda': 8,
+        'trading': 1,
+        'news': 2,
+        'polygon': 2,
+        'compute': 2,
+    }
+    
+    # WebSocket market-data streams: seconds between updates, messages buffered per client
+    STREAM_INTERVAL = 1.0
+    STREAM_QUEUE_SIZE = 8
     
     # News Configuration
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -0,0 +1,152 @@
+"""
+Process-wide in-memory candle buffers.
+
+One fixed-capacity ring per (pair, timeframe) holds the most recent candles in
+the 7-row parse_prices layout. Every candle is written twice, at slot i and at
+slot i + capacity, so the latest n candles are always one contiguous slice and
+a read is a single copy. Readers get copies taken under the ring's lock: the
+ring is refreshed in place by other threads (the forming candle is revised,
+appends overwrite the oldest slots, a reload rewrites everything).
+
+A buffer refreshes from the exchange at most once per refresh interval, and then
+only asks for the last few candles, so endpoints polling the same pair share
+one small request.
+
+Configuration (environment):
+    CANDLE_BUFFER_CAPACITY: candles kept per (pair, timeframe), default 2000.
+    CANDLE_BUFFER_REFRESH_SECONDS: minimum time between refreshes, default 1.0.
+"""
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .tradelib import get_price
+
+N_ROWS = 7
+TAIL_FETCH = 8  # Candles requested per refresh; doubled until they overlap the buffer
+
+
+class CandleRing:
+    """Most recent candles of one (pair, timeframe) in a double-written ring."""
+
+    def __init__(self, pair: str, timeframe: str, capacity: int, refresh_seconds: float):
+        self.pair = pair
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        self._prices = np.zeros((N_ROWS, 2 * capacity))
+        self._times = np.zeros(2 * capacity, dtype='datetime64[s]')
+        self.count = 0  # candles written so far
+        self.history_exhausted = False  # the exchange had fewer candles than asked for
+        self.refreshed_at = None
+
+    def _write(self, idx: int, prices: np.ndarray, times: np.ndarray):
+        """Write candles idx, idx+1, ... into both halves of the ring."""
+        slots = np.arange(idx, idx + len(times)) % self.capacity
+        for offset in (0, self.capacity):
+            self._prices[:, slots + offset] = prices
+            self._times[slots + offset] = times
+
+    def _end(self) -> int:
+        return (self.count - 1) % self.capacity + self.capacity + 1
+
+    def _load(self, prices: np.ndarray, times: np.ndarray, requested: int):
+        prices, times = prices[:, -self.capacity:], times[-self.capacity:]
+        self.count = 0
+        self._write(0, prices, times)
+        self.count = len(times)
+        self.history_exhausted = len(times) < requested
+
+    def _merge(self, prices: np.ndarray, times: np.ndarray) -> bool:
+        """Apply fetched tail candles; False when they do not overlap the buffer."""
+        last_time = self._times[self._end() - 1]
+        if len(times) == 0 or times[0] > last_time:
+            return False
+        newer = times >= last_time
+        first = self.count - 1 if times[newer][0] == last_time else self.count
+        self._write(first, prices[:, newer], times[newer])
+        self.count = first + int(newer.sum())
+        return True
+
+    def refresh(self, exchange, min_count: int = 0):
+        """Bring the buffer up to date (caller holds the lock)."""
+        if self.count == 0 or (self.count < min_count and not self.history_exhausted):
+            self._load(*get_price(self.pair, self.timeframe, self.capacity, exchange, with_times=True), self.capacity)
+        else:
+            n = TAIL_FETCH
+            while True:
+                prices, times = get_price(self.pair, self.timeframe, n, exchange, with_times=True)
+                if self._merge(prices, times):
+                    break
+                if n >= self.capacity or len(times) < n:
+                    # Too far behind to stitch: reload everything
+                    self._load(*get_price(self.pair, self.timeframe, self.capacity, exchange, with_times=True),
+                               self.capacity)
+                    break
+                n = min(2 * n, self.capacity)
+        self.refreshed_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.refresh_seconds
+
+    def latest(self, n: int) -> np.ndarray:
+        """Copy of the last n candles, fewer if fewer are buffered (caller holds the lock)."""
+        n = min(n, self.count)
+        end = self._end() if self.count else 0
+        return self._prices[:, end - n:end].copy()
+
+    def latest_times(self, n: int) -> np.ndarray:
+        """Copy of the open times of the last n candles (caller holds the lock)."""
+        n = min(n, self.count)
+        end = self._end() if self.count else 0
+        return self._times[end - n:end].copy()
+
+
+class CandleBuffers:
+    """Registry of CandleRing buffers keyed by (pair, timeframe)."""
+
+    def __init__(self, capacity: int = None, refresh_seconds: float = None):
+        self.capacity = capacity or int(os.getenv("CANDLE_BUFFER_CAPACITY", 2000))
+        self.refresh_seconds = (refresh_seconds if refresh_seconds is not None
+                                else float(os.getenv("CANDLE_BUFFER_REFRESH_SECONDS", 1.0)))
+        self._rings: Dict[Tuple[str, str], CandleRing] = {}
+        self._lock = threading.Lock()
+
+    def ring(self, pair: str, timeframe: str) -> CandleRing:
+        key = (pair, timeframe)
+        with self._lock:
+            if key not in self._rings:
+                self._rings[key] = CandleRing(pair, timeframe, self.capacity, self.refresh_seconds)
+            return self._rings[key]
+
+    def get_price(self, pair: str, timeframe: str, last_n: int, exchange, with_times: bool = False):
+        """
+        Drop-in for tradelib.get_price backed by the shared buffer.
+
+        Returns a private copy of the candles, taken while holding the ring's
+        lock so concurrent refreshes cannot change it. With with_times=True also
+        returns the candle open times (datetime64[s]). Requests larger than the
+        buffer capacity go straight to the exchange.
+        """
+        if last_n > self.capacity:
+            return get_price(pair, timeframe, last_n, exchange, with_times=with_times)
+        ring = self.ring(pair, timeframe)
+        with ring.lock:
+            if ring.is_stale() or (ring.count < last_n and not ring.history_exhausted):
+                ring.refresh(exchange, last_n)
+            if with_times:
+                return ring.latest(last_n), ring.latest_times(last_n)
+            return ring.latest(last_n)
+
+    def clear(self):
+        """Forget all buffered candles (e.g. after switching accounts)."""
+        with self._lock:
+            self._rings.clear()
+
+
+# Shared by all endpoints and services
+candle_buffers = CandleBuffers()
@@ -0,0 +1,171 @@
+"""
+Local on-disk candle store.
+
+Each (instrument, granularity) gets a directory holding one append-only binary
+file per column: candle open times as int64 epoch seconds plus the seven
+parse_prices rows as float64. Columns are read back as memory maps, so loading
+months of M5 history is a slice rather than a download.
+
+Only complete candles are stored. The time column is written last and defines
+how many candles are valid; data columns left longer by an interrupted append
+are trimmed the next time the series is opened.
+
+The store is opt-in: set CANDLE_STORE_DIR to the directory to use.
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+COLUMNS = ('open', 'close', 'high', 'low', 'volume', 'd_time', 'dow')
+TIME_COLUMN = 'time'
+
+
+class CandleSeries:
+    """Append-only columnar candles for one instrument and granularity."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._recover()
+
+    def _file(self, column: str) -> str:
+        suffix = 'i8' if column == TIME_COLUMN else 'f8'
+        return os.path.join(self.path, f"{column}.{suffix}")
+
+    def _recover(self):
+        """Trim data columns back to the committed length of the time column."""
+        count = self.count
+        for column in COLUMNS:
+            name = self._file(column)
+            if not os.path.exists(name) or os.path.getsize(name) < count * 8:
+                # Missing data for committed candles: the series can't be trusted
+                self.reset()
+                return
+            if os.path.getsize(name) > count * 8:
+                with open(name, 'r+b') as f:
+                    f.truncate(count * 8)
+
+    @property
+    def count(self) -> int:
+        name = self._file(TIME_COLUMN)
+        return os.path.getsize(name) // 8 if os.path.exists(name) else 0
+
+    def times(self) -> np.ndarray:
+        """Open times of the stored candles as datetime64[s] (read-only)."""
+        count = self.count
+        if count == 0:
+            return np.zeros(0, dtype='datetime64[s]')
+        return np.memmap(self._file(TIME_COLUMN), dtype=np.int64, mode='r', shape=(count,)).view('datetime64[s]')
+
+    def first_time(self) -> Optional[np.datetime64]:
+        times = self.times()
+        return times[0] if len(times) else None
+
+    def last_time(self) -> Optional[np.datetime64]:
+        times = self.times()
+        return times[-1] if len(times) else None
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Candles start:stop in the 7-row parse_prices layout."""
+        count = self.count
+        start, stop, _ = slice(start, stop).indices(count)
+        out = np.zeros((len(COLUMNS), max(0, stop - start)))
+        if stop > start:
+            for row, column in enumerate(COLUMNS):
+                out[row] = np.memmap(self._file(column), dtype=np.float64, mode='r', shape=(count,))[start:stop]
+        return out
+
+    def tail(self, n: int) -> np.ndarray:
+        """The last n stored candles."""
+        return self.read(max(0, self.count - n))
+
+    def append(self, prices: np.ndarray, times: np.ndarray) -> int:
+        """
+        Append complete candles, skipping any not newer than the last stored one.
+
+        Args:
+            prices (np.ndarray): Candles of shape (7, N) in parse_prices layout.
+            times (np.ndarray): Candle open times (datetime64), ascending.
+
+        Returns:
+            int: Number of candles appended.
+        """
+        times = np.asarray(times, dtype='datetime64[s]')
+        with self.lock:
+            last = self.last_time()
+            keep = times > last if last is not None else np.ones(len(times), dtype=bool)
+            if not keep.any():
+                return 0
+            prices = np.ascontiguousarray(prices[:, keep], dtype=np.float64)
+            for row, column in enumerate(COLUMNS):
+                with open(self._file(column), 'ab') as f:
+                    f.write(prices[row].tobytes())
+            # Committing the time column last makes the append visible
+            with open(self._file(TIME_COLUMN), 'ab') as f:
+                f.write(times[keep].astype(np.int64).tobytes())
+            return int(keep.sum())
+
+    def prepend(self, prices: np.ndarray, times: np.ndarray) -> int:
+        """
+        Insert complete candles older than the first stored one.
+
+        The files are append-only, so the series is rewritten locally with the new
+        candles in front; an interrupted rewrite loses the stored candles, which
+        are then downloaded again.
+
+        Args:
+            prices (np.ndarray): Candles of shape (7, N) in parse_prices layout.
+            times (np.ndarray): Candle open times (datetime64), ascending.
+
+        Returns:
+            int: Number of candles inserted.
+        """
+        times = np.asarray(times, dtype='datetime64[s]')
+        with self.lock:
+            first = self.first_time()
+            keep = times < first if first is not None else np.ones(len(times), dtype=bool)
+            if not keep.any():
+                return 0
+            stored_prices, stored_times = self.read(), np.array(self.times())
+            self.reset()
+            self.append(np.hstack([prices[:, keep], stored_prices]), np.concatenate([times[keep], stored_times]))
+            return int(keep.sum())
+
+    def reset(self):
+        """Drop every stored candle."""
+        with self.lock:
+            for column in COLUMNS + (TIME_COLUMN,):
+                open(self._file(column), 'wb').close()
+
+
+class CandleStore:
+    """Directory of CandleSeries keyed by (instrument, granularity)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._series: Dict[Tuple[str, str], CandleSeries] = {}
+        self._lock = threading.Lock()
+
+    def series(self, instrument: str, granularity: str) -> CandleSeries:
+        key = (instrument, granularity)
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = CandleSeries(os.path.join(self.root, instrument, granularity))
+            return self._series[key]
+
+
+_default_store: Optional[CandleStore] = None
+
+
+def default_store() -> Optional[CandleStore]:
+    """The store configured by CANDLE_STORE_DIR, or None when it is not set."""
+    global _default_store
+    root = os.getenv("CANDLE_STORE_DIR")
+    if not root:
+        return None
+    if _default_store is None or _default_store.root != root:
+        _default_store = CandleStore(root)
+    return _default_store
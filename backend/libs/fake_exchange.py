@@ -0,0 +1,416 @@
+"""
+Offline stand-in for the OANDA v20 API.
+
+FakeExchange implements the one method the backend calls, request(endpoint),
+for InstrumentsCandles, OrderCreate, TradeClose, TradeDetails, TradesList and
+AccountSummary, with the response shapes OANDA returns. It lets the app run,
+be benchmarked and be load-tested without network access or API keys.
+
+Candles come from arrays given to load_candles() (e.g. synthetic.generate_candles
+output), from a recorded candle store when it holds the requested instrument
+and granularity, and otherwise from a seeded random walk laid on
+the real clock: the candle containing "now" is still forming and its close
+moves as time passes, so polling behaves like the live API. Orders fill at the
+forming QUOTE_GRANULARITY close. Every request can be delayed and can fail
+with a V20Error at a configurable rate.
+
+Configuration (environment):
+    EXCHANGE_BACKEND: set to "fake" to make tradelib.connect() return a FakeExchange.
+    FAKE_EXCHANGE_LATENCY_MS / FAKE_EXCHANGE_JITTER_MS: fixed delay per request
+        plus a uniformly random extra delay, default 0.
+    FAKE_EXCHANGE_ERROR_RATE: fraction of requests failing, default 0.
+    FAKE_EXCHANGE_ERROR_CODE: HTTP code of the injected failures, default 503.
+    FAKE_EXCHANGE_SEED: seed of the synthetic prices, default 0.
+    FAKE_EXCHANGE_DATA_DIR: candle store directory (CANDLE_STORE_DIR layout)
+        holding recorded candles to replay.
+    FAKE_EXCHANGE_BALANCE: starting account balance, default 100000.
+"""
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from oandapyV20.contrib.generic import granularity_to_time
+from oandapyV20.endpoints.accounts import AccountSummary
+from oandapyV20.endpoints.instruments import InstrumentsCandles
+from oandapyV20.endpoints.orders import OrderCreate
+from oandapyV20.endpoints.trades import TradeClose, TradeDetails, TradesList
+from oandapyV20.exceptions import V20Error
+
+from .candle_store import CandleSeries, CandleStore
+
+MAX_COUNT = 5000  # OANDA rejects larger 'count' values
+DEFAULT_COUNT = 500
+QUOTE_GRANULARITY = 'M5'  # Candles whose forming close is the fill price of orders
+
+SYNTHETIC_ORIGIN = np.datetime64('2010-01-01T00:00:00', 's')
+SYNTHETIC_HORIZON = np.datetime64('2040-01-01T00:00:00', 's')
+BLOCK = 1024  # Synthetic candles generated together
+
+
+def _parse_time(value) -> int:
+    """OANDA 'from'/'to' value (RFC3339 or date) as epoch seconds."""
+    text = str(value).rstrip('Z')[:19]
+    return int(np.datetime64(text, 's').astype(np.int64))
+
+
+def _decimals(instrument: str) -> int:
+    return 3 if 'JPY' in instrument else 5
+
+
+def _format_candles(prices: np.ndarray, times: np.ndarray, complete: np.ndarray, decimals: int) -> list:
+    """Build OANDA candle dicts from the 7-row layout."""
+    if len(times) == 0:
+        return []
+    stamps = np.char.add(np.datetime_as_string(times.astype('datetime64[s]'), unit='s'), '.000000000Z').tolist()
+    o, c, h, l = (np.char.mod(f'%.{decimals}f', row).tolist() for row in prices[:4])
+    volume = prices[4].astype(np.int64).tolist()
+    return [{'complete': done, 'volume': v, 'time': t, 'mid': {'o': oo, 'h': hh, 'l': ll, 'c': cc}}
+            for done, v, t, oo, cc, hh, ll in zip(complete.tolist(), volume, stamps, o, c, h, l)]
+
+
+class _RecordedCandles:
+    """Candles replayed from a candle store series; all of them are complete."""
+
+    def __init__(self, series: CandleSeries):
+        self.series = series
+
+    def bounds(self, now: int) -> Tuple[int, int]:
+        return 0, self.series.count
+
+    def locate(self, epoch: int, side: str) -> int:
+        return int(np.searchsorted(self.series.times(), np.datetime64(epoch, 's'), side=side))
+
+    def load(self, lo: int, hi: int, now: int):
+        return self.series.read(lo, hi), np.array(self.series.times()[lo:hi]), np.ones(hi - lo, dtype=bool)
+
+
+class _ArrayCandles:
+    """Candles replayed from in-memory arrays, e.g. from synthetic.generate_candles."""
+
+    def __init__(self, prices: np.ndarray, times: np.ndarray):
+        self.prices = np.asarray(prices, dtype=float)
+        self._times = np.asarray(times, dtype='datetime64[s]')
+
+    def bounds(self, now: int) -> Tuple[int, int]:
+        return 0, len(self._times)
+
+    def locate(self, epoch: int, side: str) -> int:
+        return int(np.searchsorted(self._times, np.datetime64(epoch, 's'), side=side))
+
+    def load(self, lo: int, hi: int, now: int):
+        return self.prices[:, lo:hi], self._times[lo:hi], np.ones(hi - lo, dtype=bool)
+
+
+class _SyntheticCandles:
+    """
+    Seeded random walk of one (instrument, granularity), candle k opening at k * seconds.
+
+    The log price is fixed at every BLOCK-th candle by a coarse random walk and
+    filled in between with a Brownian bridge seeded by the block number, so any
+    range is generated on its own and always gives the same candles.
+    """
+
+    def __init__(self, instrument: str, seconds: int, seed: int):
+        self.seconds = seconds
+        self.key = [seed, zlib.crc32(instrument.encode()), seconds]
+        self.base = 150.0 if 'JPY' in instrument else 1.0 + self.key[1] % 1000 / 2000
+        self.sigma = 1e-4 * np.sqrt(seconds / 60)  # log-return std per candle
+        self.origin = int(SYNTHETIC_ORIGIN.astype(np.int64)) // seconds
+        n_blocks = (int(SYNTHETIC_HORIZON.astype(np.int64)) // seconds - self.origin) // BLOCK + 1
+        steps = np.random.default_rng(self.key).standard_normal(n_blocks) * self.sigma * np.sqrt(BLOCK)
+        self.levels = np.concatenate([[0.0], np.cumsum(steps)])
+
+    def bounds(self, now: int) -> Tuple[int, int]:
+        last = min(now // self.seconds, self.origin + (len(self.levels) - 1) * BLOCK - 1)
+        return self.origin, last + 1
+
+    def locate(self, epoch: int, side: str) -> int:
+        if side == 'left':
+            return -(-epoch // self.seconds)
+        return epoch // self.seconds + 1
+
+    def _block(self, b: int) -> np.ndarray:
+        """Open/close/high/low/volume of the candles in block b."""
+        rng = np.random.default_rng(self.key + [b])
+        walk = np.concatenate([[0.0], np.cumsum(rng.standard_normal(BLOCK) * self.sigma)])
+        frac = np.arange(BLOCK + 1) / BLOCK
+        path = self.base * np.exp(self.levels[b] + walk + frac * (self.levels[b + 1] - self.levels[b] - walk[-1]))
+        o, c = path[:-1], path[1:]
+        wicks = np.exp(np.abs(rng.standard_normal((2, BLOCK))) * self.sigma * 0.5)
+        volume = rng.poisson(20 * np.sqrt(self.seconds), BLOCK) + 1
+        return np.vstack([o, c, np.maximum(o, c) * wicks[0], np.minimum(o, c) / wicks[1], volume])
+
+    def load(self, lo: int, hi: int, now: int):
+        rel_lo, rel_hi = lo - self.origin, hi - self.origin
+        blocks = [self._block(b) for b in range(rel_lo // BLOCK, (rel_hi - 1) // BLOCK + 1)] if hi > lo else []
+        start = rel_lo // BLOCK * BLOCK
+        ochlv = np.hstack(blocks)[:, rel_lo - start:rel_hi - start] if blocks else np.zeros((5, 0))
+
+        times = np.arange(lo, hi, dtype=np.int64) * self.seconds
+        complete = times + self.seconds <= now
+        if len(times) and not complete[-1]:
+            # Forming candle: move from the open towards the final close as time passes
+            frac = (now - times[-1]) / self.seconds
+            o, c, h, l = ochlv[:4, -1]
+            close = o + (c - o) * frac
+            ochlv[1:4, -1] = [close, max(o, close) + (h - max(o, c)) * frac, min(o, close) - (min(o, c) - l) * frac]
+            ochlv[4, -1] = max(1, round(ochlv[4, -1] * frac))
+
+        times = times.astype('datetime64[s]')
+        days = times.astype('datetime64[D]')
+        secs = (times - days).astype(np.int64)
+        d_time = (secs // 3600) + (secs // 60 % 60) / 100 + (secs % 60) / 10000
+        dow = (days.astype(np.int64) + 3) % 7
+        return np.vstack([ochlv, d_time, dow]), times, complete
+
+
+class FakeExchange:
+    """In-process replacement for oandapyV20.API serving recorded or synthetic data."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_code: int = 503, seed: int = 0, data_dir: Optional[str] = None,
+                 balance: float = 100000.0, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            latency (float): Seconds every request is delayed by.
+            jitter (float): Upper bound of an extra uniformly random delay (seconds).
+            error_rate (float): Probability that a request raises V20Error.
+            error_code (int): HTTP code of the injected errors.
+            seed (int): Seed of the synthetic prices, latency jitter and errors.
+            data_dir (str): Candle store directory with recorded candles to replay.
+            balance (float): Starting account balance.
+            clock (callable): Returns the current epoch time; replace it to freeze
+                or speed up the synthetic market.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.seed = seed
+        self.store = CandleStore(data_dir) if data_dir else None
+        self.clock = clock
+        self.balance = balance
+        self.requests = 0
+        self.errors = 0
+        self._rng = np.random.default_rng(seed)
+        self._sources: Dict[Tuple[str, str], object] = {}
+        self._trades: Dict[str, dict] = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "FakeExchange":
+        """FakeExchange configured by the FAKE_EXCHANGE_* environment variables."""
+        return cls(latency=float(os.getenv("FAKE_EXCHANGE_LATENCY_MS", 0)) / 1000,
+                   jitter=float(os.getenv("FAKE_EXCHANGE_JITTER_MS", 0)) / 1000,
+                   error_rate=float(os.getenv("FAKE_EXCHANGE_ERROR_RATE", 0)),
+                   error_code=int(os.getenv("FAKE_EXCHANGE_ERROR_CODE", 503)),
+                   seed=int(os.getenv("FAKE_EXCHANGE_SEED", 0)),
+                   data_dir=os.getenv("FAKE_EXCHANGE_DATA_DIR") or None,
+                   balance=float(os.getenv("FAKE_EXCHANGE_BALANCE", 100000)))
+
+    def request(self, endpoint):
+        """Answer an oandapyV20 endpoint the way oandapyV20.API.request would."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise V20Error(self.error_code, '{"errorMessage": "Injected fake exchange failure"}')
+
+        handlers = {
+            InstrumentsCandles: self._candles,
+            OrderCreate: self._order_create,
+            TradeClose: self._trade_close,
+            TradeDetails: self._trade_details,
+            TradesList: self._trades_list,
+            AccountSummary: self._account_summary,
+        }
+        handler = handlers.get(type(endpoint))
+        if handler is None:
+            raise NotImplementedError(f"FakeExchange does not support {type(endpoint).__name__}")
+        response = handler(str(endpoint).split('/'), getattr(endpoint, 'params', None) or {},
+                           getattr(endpoint, 'data', None) or {})
+        endpoint.response = response
+        endpoint.status_code = endpoint.expected_status
+        return response
+
+    # Candles
+
+    def _source(self, instrument: str, granularity: str):
+        key = (instrument, granularity)
+        with self._lock:
+            if key not in self._sources:
+                series = self.store.series(instrument, granularity) if self.store else None
+                if series is not None and series.count:
+                    self._sources[key] = _RecordedCandles(series)
+                else:
+                    self._sources[key] = _SyntheticCandles(instrument, granularity_to_time(granularity), self.seed)
+            return self._sources[key]
+
+    def load_candles(self, instrument: str, granularity: str, prices: np.ndarray, times: np.ndarray):
+        """
+        Serve the given candles for (instrument, granularity) instead of synthetic ones.
+
+        Args:
+            prices (np.ndarray): Candles of shape (7, N) in parse_prices layout.
+            times (np.ndarray): Candle open times (datetime64), ascending.
+        """
+        with self._lock:
+            self._sources[(instrument, granularity)] = _ArrayCandles(prices, times)
+
+    def _candles(self, path, params, data):
+        instrument = path[2]
+        granularity = params.get('granularity', 'S5')
+        if 'count' in params and 'from' in params and 'to' in params:
+            raise V20Error(400, '{"errorMessage": "Cannot specify count with both from and to"}')
+        count = int(params.get('count', DEFAULT_COUNT))
+        if not 0 < count <= MAX_COUNT:
+            raise V20Error(400, f'{{"errorMessage": "Invalid value specified for \'count\': {count}"}}')
+
+        now = int(self.clock())
+        source = self._source(instrument, granularity)
+        first, stop = source.bounds(now)
+        if 'from' in params:
+            include_first = str(params.get('includeFirst', True)).lower() != 'false'
+            lo = max(first, source.locate(_parse_time(params['from']), 'left' if include_first else 'right'))
+            hi = min(stop, source.locate(_parse_time(params['to']), 'left')) if 'to' in params else min(stop, lo + count)
+        else:
+            hi = min(stop, source.locate(_parse_time(params['to']), 'left')) if 'to' in params else stop
+            lo = max(first, hi - count)
+        prices, times, complete = source.load(lo, max(lo, hi), now)
+        return {'instrument': instrument, 'granularity': granularity,
+                'candles': _format_candles(prices, times, complete, _decimals(instrument))}
+
+    def quote(self, instrument: str) -> float:
+        """Current price of an instrument: the forming QUOTE_GRANULARITY close."""
+        now = int(self.clock())
+        source = self._source(instrument, QUOTE_GRANULARITY)
+        first, stop = source.bounds(now)
+        prices, _, _ = source.load(max(first, stop - 1), stop, now)
+        return float(prices[1, -1])
+
+    # Account and trades
+
+    def _next_id(self) -> str:
+        self._last_id += 1
+        return str(self._last_id)
+
+    def _now(self) -> str:
+        return np.datetime_as_string(np.datetime64(int(self.clock()), 's'), unit='s') + '.000000000Z'
+
+    def _unrealized(self, trade: dict) -> float:
+        return (self.quote(trade['instrument']) - float(trade['price'])) * float(trade['currentUnits'])
+
+    def _trade_view(self, trade: dict) -> dict:
+        view = dict(trade)
+        if trade['state'] == 'OPEN':
+            view['unrealizedPL'] = f"{self._unrealized(trade):.4f}"
+        return view
+
+    def _order_create(self, path, params, data):
+        order = data.get('order', {})
+        if order.get('type', 'MARKET') != 'MARKET':
+            raise V20Error(400, '{"errorMessage": "FakeExchange only fills MARKET orders"}')
+        instrument = order['instrument']
+        units = int(float(order['units']))
+        price = f"{self.quote(instrument):.{_decimals(instrument)}f}"
+        with self._lock:
+            create_id = self._next_id()
+            fill_id = self._next_id()
+            time_str = self._now()
+            self._trades[fill_id] = {
+                'id': fill_id, 'instrument': instrument, 'price': price, 'openTime': time_str,
+                'initialUnits': str(units), 'currentUnits': str(units), 'state': 'OPEN', 'realizedPL': '0.0000',
+            }
+            # Attached orders are recorded but never triggered
+            for kind in ('takeProfitOnFill', 'stopLossOnFill'):
+                if kind in order:
+                    self._trades[fill_id][kind] = order[kind]
+            return {
+                'orderCreateTransaction': {'id': create_id, 'type': 'MARKET_ORDER', 'instrument': instrument,
+                                           'units': str(units), 'time': time_str},
+                'orderFillTransaction': {'id': fill_id, 'type': 'ORDER_FILL', 'orderID': create_id,
+                                         'instrument': instrument, 'units': str(units), 'price': price,
+                                         'time': time_str, 'pl': '0.0000',
+                                         'tradeOpened': {'tradeID': fill_id, 'units': str(units),
+                                                         'price': price}},
+                'relatedTransactionIDs': [create_id, fill_id],
+                'lastTransactionID': fill_id,
+            }
+
+    def _trade_close(self, path, params, data):
+        trade_id = path[4]
+        with self._lock:
+            trade = self._trades.get(trade_id)
+            if trade is None or trade['state'] != 'OPEN':
+                raise V20Error(404, f'{{"errorMessage": "The Trade specified does not exist", "tradeID": "{trade_id}"}}')
+            open_units = int(trade['currentUnits'])
+            requested = data.get('units', 'ALL')
+            units = open_units if requested == 'ALL' else int(np.sign(open_units)) * min(abs(int(float(requested))), abs(open_units))
+
+        price = f"{self.quote(trade['instrument']):.{_decimals(trade['instrument'])}f}"
+        pl = (float(price) - float(trade['price'])) * units
+        with self._lock:
+            create_id = self._next_id()
+            fill_id = self._next_id()
+            remaining = open_units - units
+            trade['currentUnits'] = str(remaining)
+            trade['realizedPL'] = f"{float(trade['realizedPL']) + pl:.4f}"
+            if remaining == 0:
+                trade['state'] = 'CLOSED'
+                trade['closeTime'] = self._now()
+            self.balance += pl
+            closed = {'tradeID': trade_id, 'units': str(-units), 'price': price, 'realizedPL': f"{pl:.4f}"}
+            fill = {'id': fill_id, 'type': 'ORDER_FILL', 'orderID': create_id, 'instrument': trade['instrument'],
+                    'units': str(-units), 'price': price, 'time': self._now(), 'pl': f"{pl:.4f}",
+                    'accountBalance': f"{self.balance:.4f}"}
+            if remaining == 0:
+                fill['tradesClosed'] = [closed]
+            else:
+                fill['tradeReduced'] = closed
+            return {'orderCreateTransaction': {'id': create_id, 'type': 'MARKET_ORDER', 'tradeClose': {
+                        'tradeID': trade_id, 'units': str(requested)}},
+                    'orderFillTransaction': fill,
+                    'relatedTransactionIDs': [create_id, fill_id],
+                    'lastTransactionID': fill_id}
+
+    def _trade_details(self, path, params, data):
+        trade_id = path[4]
+        with self._lock:
+            trade = self._trades.get(trade_id)
+            if trade is None:
+                raise V20Error(404, f'{{"errorMessage": "The Trade specified does not exist", "tradeID": "{trade_id}"}}')
+            trade = dict(trade)
+            last_id = str(self._last_id)
+        return {'trade': self._trade_view(trade), 'lastTransactionID': last_id}
+
+    def _trades_list(self, path, params, data):
+        with self._lock:
+            trades = [dict(t) for t in self._trades.values() if t['state'] == 'OPEN']
+            last_id = str(self._last_id)
+        return {'trades': [self._trade_view(t) for t in reversed(trades)], 'lastTransactionID': last_id}
+
+    def _account_summary(self, path, params, data):
+        with self._lock:
+            trades = [dict(t) for t in self._trades.values() if t['state'] == 'OPEN']
+            balance = self.balance
+            last_id = str(self._last_id)
+        unrealized = sum(self._unrealized(t) for t in trades)
+        return {'account': {'id': path[2], 'currency': 'USD', 'balance': f"{balance:.4f}",
+                            'unrealizedPL': f"{unrealized:.4f}", 'NAV': f"{balance + unrealized:.4f}",
+                            'marginAvailable': f"{balance + unrealized:.4f}", 'openTradeCount': len(trades),
+                            'lastTransactionID': last_id},
+                'lastTransactionID': last_id}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "injected_errors": self.errors,
+                    "open_trades": sum(t['state'] == 'OPEN' for t in self._trades.values())}
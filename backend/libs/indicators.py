@@ -1,5 +1,9 @@
+import bisect
 import numpy as np
 from scipy import signal
+from .rolling import rolling_rsi, rolling_efficiency, rolling_max, rolling_min
+from .range_bars import RangeBarAggregator
+from .recurrence import first_order, seeded_ema
 
 OPEN_PRICE = 0
 CLOSE_PRICE =1
@@ -10,29 +14,17 @@ D_TIME = 5
 D_TIME_MOD = 6
 PIP = 10000
 
-def ema(data, period):
-    """Custom EMA implementation to replace talib.EMA"""
-    alpha = 2 / (period + 1)
-    ema_values = np.zeros_like(data)
-    ema_values[0] = data[0]
-    
-    for i in range(1, len(data)):
-        ema_values[i] = alpha * data[i] + (1 - alpha) * ema_values[i-1]
-    
-    return ema_values
+def ema(data, period, axis=-1):
+    """Custom EMA implementation to replace talib.EMA; always returns floats"""
+    # y[i] = alpha * x[i] + (1 - alpha) * y[i-1], seeded with the first value
+    return seeded_ema(data, 2 / (period + 1), axis=axis)
 
 def atr(high, low, close, period):
     """Custom ATR implementation to replace talib.ATR"""
     tr = np.zeros_like(high)
     tr[0] = high[0] - low[0]
-    
-    for i in range(1, len(high)):
-        tr[i] = max(
-            high[i] - low[i],
-            abs(high[i] - close[i-1]),
-            abs(low[i] - close[i-1])
-        )
-    
+    tr[1:] = np.maximum(high[1:] - low[1:],
+                        np.maximum(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
     return ema(tr, period)
 
 def market_eff_win(price_win):
@@ -42,13 +34,7 @@ def market_eff_win(price_win):
     return  eff
 
 def market_eff(prices, winlen):
-    eff = np.zeros((prices.shape[1]))
-    barlen = (prices[CLOSE_PRICE] - prices[OPEN_PRICE])
-    for n in range(winlen, prices.shape[1]):
-        price_change = prices[CLOSE_PRICE,n] - prices[OPEN_PRICE,n-winlen]
-        eff[n] = (price_change) / (np.sum(np.abs(barlen[n-winlen : n])))
-        #eff[n] = (price_change - np.sum(barlen[n-winlen : n]))  #* prices[VOLUME,n]  
-    return np.clip(eff, -1, 1)
+    return rolling_efficiency(prices, winlen)
 
 # def market_eff(prices, winlen):
 #     eff = np.zeros((prices.shape[1], 1))
@@ -84,14 +70,8 @@ def zlema_ochl(ochl: np.ndarray, period: int) -> np.ndarray:
     price_adjusted = np.copy(ochl)  # Copy to avoid modifying original
     price_adjusted[:, lag:] = 2 * ochl[:, lag:] - ochl[:, :-lag]
 
-    # Exponential Moving Average (EMA) calculation
-    ema = np.zeros_like(ochl)
-    ema[:, 0] = ochl[:, 0]  # Initialize first column
-
-    for i in range(1, ochl.shape[1]):
-        ema[:, i] = alpha * price_adjusted[:, i] + (1 - alpha) * ema[:, i - 1]
-
-    return ema
+    # Exponential Moving Average (EMA) calculation, seeded with the first column
+    return seeded_ema(price_adjusted, alpha, seed=ochl[:, 0])
 
 def zlema_ochl_vectorized(ochl: np.ndarray, period: int) -> np.ndarray:
     """
@@ -115,20 +95,142 @@ def zlema_ochl_vectorized(ochl: np.ndarray, period: int) -> np.ndarray:
     price_adjusted = np.copy(ochl)  # Copy to avoid modifying original
     price_adjusted[:, lag:] = 2 * ochl[:, lag:] - ochl[:, :-lag]
 
-    # Vectorized EMA calculation using lfilter
-    # For EMA: y[n] = alpha * x[n] + (1-alpha) * y[n-1]
-    # This is equivalent to: y[n] - (1-alpha) * y[n-1] = alpha * x[n]
-    # In filter terms: b = [alpha], a = [1, -(1-alpha)]
-    b = np.array([alpha])
-    a = np.array([1, -(1 - alpha)])
-    
-    # Apply filter to each row
-    ema = np.zeros_like(ochl)
-    for i in range(4):  # Process each OCHL row
-        # lfilter needs 1D input, so we process row by row
-        ema[i, :] = signal.lfilter(b, a, price_adjusted[i, :])
-    
-    return ema
+    # Vectorized EMA calculation: y[n] = alpha * x[n] + (1-alpha) * y[n-1], starting from zero
+    return first_order(price_adjusted, alpha, 1 - alpha)
+
+def zlema_ochl_multi(ochl: np.ndarray, periods) -> np.ndarray:
+    """
+    ZLEMA of OCHL data for several periods at once, identical to calling zlema_ochl per period.
+
+    The lag-adjusted inputs of all periods are written by slicing into one (W, 4, N)
+    block, and the seeded EMA of each distinct smoothing factor runs as a single
+    lfilter call over its rows along the time axis. The coefficients and initial
+    state are those of seeded_ema, so results match zlema_ochl bit for bit.
+
+    Args:
+        ochl (np.ndarray): Input OCHL data of shape (4, N).
+        periods (list[int]): ZLEMA periods.
+
+    Returns:
+        np.ndarray: ZLEMA values of shape (W, 4, N), in the order of `periods`.
+    """
+    if ochl.shape[0] != 4:
+        raise ValueError("Input array must have shape (4, N) corresponding to Open, Close, High, Low")
+
+    ochl = np.asarray(ochl, dtype=float)
+    periods = np.asarray(periods, dtype=int)
+    n = ochl.shape[1]
+    if n == 0 or len(periods) == 0:
+        return np.zeros((len(periods), 4, n))
+
+    # Adjusted price for every period: 2 * price[t] - price[t - lag] once t >= lag.
+    # The EMAs then overwrite it in place, so only one (W, 4, N) block is allocated.
+    zl = np.empty((len(periods), 4, n))
+    for i, period in enumerate(periods):
+        lag = min((period - 1) // 2, n)  # Lag correction factor
+        zl[i, :, :lag] = ochl[:, :lag]
+        np.subtract(2 * ochl[:, lag:], ochl[:, :n - lag], out=zl[i, :, lag:])
+
+    # EMA seeded with the first column: y[0] = x[0], then y[t] = alpha * x[t] + (1 - alpha) * y[t - 1]
+    zl[:, :, 0] = ochl[:, 0]
+    alphas = 2 / (periods + 1)  # EMA smoothing factor per period
+    for alpha in np.unique(alphas) if n > 1 else ():
+        rows = np.flatnonzero(alphas == alpha)
+        block = slice(rows[0], rows[0] + 1) if len(rows) == 1 else rows
+        decay = 1 - alpha
+        zi = np.broadcast_to(decay * ochl[:, :1], (len(rows), 4, 1))
+        zl[block, :, 1:], _ = signal.lfilter([alpha], [1, -decay], zl[block, :, 1:], axis=-1, zi=zi)
+    return zl
+
+class ZlemaOCHLState:
+    """
+    Streaming ZLEMA for OCHL data that reproduces zlema_ochl column by column.
+
+    Keeps the last `lag` raw candles and the last EMA value for each OCHL row, so
+    appending a candle or revising the still-forming one costs O(1) instead of
+    recomputing the whole series.
+
+    Example:
+        state = ZlemaOCHLState.from_ochl(ochl[:, :-1], period)
+        state.update(ochl[:, -1])          # new candle printed
+        state.update(ochl_live, revise=True)  # last candle moved
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.lag = (period - 1) // 2  # Lag correction factor
+        self.alpha = 2 / (period + 1)  # EMA smoothing factor
+        self.count = 0
+        # Ring of the last lag + 1 raw candles (current one included)
+        self._raw = np.zeros((4, self.lag + 1))
+        self._ema = np.zeros(4)
+        self._prev_ema = np.zeros(4)
+
+    @classmethod
+    def from_ochl(cls, ochl: np.ndarray, period: int) -> "ZlemaOCHLState":
+        """Build a state primed with historical OCHL data of shape (4, N)."""
+        state = cls(period)
+        n = ochl.shape[1]
+        if state.lag == 0 or n == 0:
+            state.extend(ochl)
+            return state
+
+        zl = zlema_ochl(ochl, period)
+        state.count = n
+        state._ema = zl[:, -1].copy()
+        if n > 1:
+            state._prev_ema = zl[:, -2].copy()
+        for t in range(max(0, n - state.lag - 1), n):
+            state._raw[:, t % (state.lag + 1)] = ochl[:, t]
+        return state
+
+    @property
+    def value(self) -> np.ndarray:
+        """ZLEMA of the most recent candle, shape (4,)."""
+        return self._ema.copy()
+
+    def update(self, candle: np.ndarray, revise: bool = False) -> np.ndarray:
+        """
+        Feed one OCHL candle.
+
+        Args:
+            candle (np.ndarray): Open, Close, High, Low of the candle (shape (4,)).
+            revise (bool): Replace the last candle instead of appending a new one.
+
+        Returns:
+            np.ndarray: The ZLEMA values for the candle (shape (4,)).
+        """
+        candle = np.asarray(candle, dtype=float)[:4]
+        if revise:
+            if self.count == 0:
+                raise ValueError("No candle to revise")
+            t = self.count - 1
+        else:
+            t = self.count
+            self._prev_ema = self._ema
+            self.count += 1
+
+        self._raw[:, t % (self.lag + 1)] = candle
+        if t == 0:
+            self._ema = candle.copy()
+            return self.value
+
+        if self.lag > 0 and t >= self.lag:
+            # Slot of t - lag is the one the next candle will overwrite
+            adjusted = 2 * candle - self._raw[:, (t + 1) % (self.lag + 1)]
+        else:
+            adjusted = candle
+        self._ema = self.alpha * adjusted + (1 - self.alpha) * self._prev_ema
+        return self.value
+
+    def extend(self, ochl: np.ndarray) -> np.ndarray:
+        """Append every column of `ochl` (shape (4, N)) and return their ZLEMA values."""
+        if ochl.shape[0] != 4:
+            raise ValueError("Input array must have shape (4, N) corresponding to Open, Close, High, Low")
+        out = np.zeros((4, ochl.shape[1]))
+        for i in range(ochl.shape[1]):
+            out[:, i] = self.update(ochl[:, i])
+        return out
 
 #         #eff[n+winlen,  1]=np.mean(prices[VOLUME,n: n + winlen]) 
 #         #eff[n+winlen,  0]=prices[d_time,n] 
@@ -174,14 +276,52 @@ def update_HA(HA, price):
 	return np.asarray([ha_open, ha_close, np.amax(elements),  np.amin(elements), price[VOLUME]  ] )
 
 def calc_HA(prices):
-	HA = np.zeros((5, prices.shape[1]))
-	HA[OPEN_PRICE,0] = prices[OPEN_PRICE,0]
-	HA[CLOSE_PRICE,0] = prices[CLOSE_PRICE,0] 	
-	HA[HIGH_PRICE,0] = prices[HIGH_PRICE,0]
-	HA[LOW_PRICE,0] = prices[LOW_PRICE,0]
-	for n in range(1, prices.shape[1]):
-		HA[:,n] =  update_HA(HA[:,n-1], prices[:,n])
-	return HA
+	return heikin_ashi(prices)
+
+def heikin_ashi(prices: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Heikin-Ashi candles, identical to iterating update_HA.
+
+    HA close is elementwise and HA open is the first-order recurrence
+    open[n] = (open[n-1] + close[n-1]) / 2, which runs through the recurrence
+    kernel so there is no Python-level loop over candles.
+
+    Args:
+        prices (np.ndarray): Candles of shape (R, N) or a stack (P, R, N) with rows
+            in Open, Close, High, Low[, Volume, ...] order.
+
+    Returns:
+        np.ndarray: HA candles of shape (..., 5, N), or (..., 4, N) when the input
+            has no volume row. The first column holds the raw candle.
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_rows = 5 if prices.shape[-2] > VOLUME else 4
+    n = prices.shape[-1]
+    ha = np.zeros(prices.shape[:-2] + (n_rows, n))
+    if n == 0:
+        return ha
+
+    open_p = prices[..., OPEN_PRICE, :]
+    high_p = prices[..., HIGH_PRICE, :]
+    low_p = prices[..., LOW_PRICE, :]
+
+    ha_close = (open_p + prices[..., CLOSE_PRICE, :] + high_p + low_p) / 4
+    ha_close[..., 0] = prices[..., CLOSE_PRICE, 0]
+
+    ha_open = np.empty_like(ha_close)
+    ha_open[..., 0] = open_p[..., 0]
+    # y[n] = 0.5 * close[n-1] + 0.5 * y[n-1], seeded with the first raw open
+    ha_open[..., 1:] = first_order(ha_close[..., :-1], 0.5, 0.5, initial=open_p[..., 0])
+
+    ha[..., OPEN_PRICE, :] = ha_open
+    ha[..., CLOSE_PRICE, :] = ha_close
+    ha[..., HIGH_PRICE, :] = np.maximum(np.maximum(high_p, low_p), np.maximum(ha_open, ha_close))
+    ha[..., LOW_PRICE, :] = np.minimum(np.minimum(high_p, low_p), np.minimum(ha_open, ha_close))
+    ha[..., HIGH_PRICE, 0] = high_p[..., 0]
+    ha[..., LOW_PRICE, 0] = low_p[..., 0]
+    if n_rows == 5:
+        ha[..., VOLUME, 1:] = prices[..., VOLUME, 1:]
+    return ha
 
 def update_rsi(HA):	
 	rs = HA[CLOSE_PRICE] - HA[OPEN_PRICE]
@@ -189,10 +329,7 @@ def update_rsi(HA):
 	return  100 - (100/(1+rs))
 
 def calc_rsi(HA,win):
-	rsi = np.ones((HA.shape[1])) 
-	for n in range(win, HA.shape[1]):
-		rsi[n] = update_rsi(HA[:,n-win:n] )
-	return rsi
+	return rolling_rsi(HA, win)
 
 def vwap(price, vol):
     price = np.array(price)
@@ -211,23 +348,24 @@ def vpt(price, volume, win):
     vpt = np.zeros((price.shape[1]))
     minmax = np.zeros((price.shape[1],2))
     
-    for n in range(1,price.shape[1]):
-        percent_change = ((price[CLOSE_PRICE,n] - price[CLOSE_PRICE,n-1]) )
-        vpt[n] = vpt[n-1] + (volume[n] * percent_change)
-        if n > win:
-            minmax[n,0] = np.min(vpt[n-win:n])
-            minmax[n,1] = np.max(vpt[n-win:n])
+    percent_change = np.diff(price[CLOSE_PRICE])
+    vpt[1:] = np.cumsum(volume[1:] * percent_change)
+    # minmax[n] covers vpt[n-win:n] for n > win
+    if price.shape[1] > win + 1:
+        minmax[win+1:, 0] = rolling_min(vpt, win)[win:-1]
+        minmax[win+1:, 1] = rolling_max(vpt, win)[win:-1]
     return vpt, minmax
 
 
 def vpt_2(price, volume):
     vpt = np.zeros((price.shape[1],))
     mn_vol = ema(volume, 5)
-    for n in range(1,price.shape[1]):
-        if volume[n] > mn_vol[n]:
-            vpt[n] = (price[CLOSE_PRICE,n] - price[CLOSE_PRICE,n-1]) * PIP * volume[n]
-        else:
-            vpt[n] = vpt[n-1]
+    # High-volume candles record their volume-weighted move, the others carry the last value
+    active = np.zeros(price.shape[1], dtype=bool)
+    active[1:] = volume[1:] > mn_vol[1:]
+    vpt[1:] = np.diff(price[CLOSE_PRICE]) * PIP * volume[1:]
+    last_active = np.maximum.accumulate(np.where(active, np.arange(price.shape[1]), 0))
+    return vpt[last_active]
 
 
 
@@ -310,9 +448,8 @@ def zlema_optimized(price: np.ndarray, period: int) -> np.ndarray:
     zlema = np.zeros_like(price)
     zlema[:lag] = price[:lag]
     
-    # Vectorized EMA calculation
-    for i in range(lag, len(price)):
-        zlema[i] = alpha * price_adjusted[i-lag] + (1 - alpha) * zlema[i-1]
+    # Vectorized EMA calculation, continuing from the last unadjusted price
+    zlema[lag:] = first_order(price_adjusted, alpha, 1 - alpha, initial=zlema[lag-1])
     
     return zlema
 
@@ -359,32 +496,10 @@ def aggregate_ha_zlema(prices, pip_threshold, zlema_window):
     Aggregate by price movement, convert to Heiken Ashi, and compute ZLEMA.
     Returns (agg, ha, zlema, closes)
     """
-    def aggregate_by_price_movement(prices, pip_threshold):
-        n_candles = len(prices[0])
-        aggregated = []
-        closes = []
-        start_idx = 0
-        start_price = prices[CLOSE_PRICE, 0]
-        for i in range(1, n_candles):
-            current_price = prices[CLOSE_PRICE, i]
-            price_change = abs(current_price - start_price) * PIP
-            if price_change >= pip_threshold:
-                bar = np.zeros(7)
-                bar[OPEN_PRICE] = prices[OPEN_PRICE, start_idx]
-                bar[CLOSE_PRICE] = prices[CLOSE_PRICE, i]
-                bar[HIGH_PRICE] = np.max(prices[HIGH_PRICE, start_idx:i+1])
-                bar[LOW_PRICE] = np.min(prices[LOW_PRICE, start_idx:i+1])
-                bar[VOLUME] = np.sum(prices[VOLUME, start_idx:i+1])
-                bar[D_TIME] = prices[D_TIME, start_idx]
-                bar[D_TIME_MOD] = prices[D_TIME_MOD, start_idx]
-                aggregated.append(bar)
-                closes.append(prices[CLOSE_PRICE, i])
-                start_idx = i + 1
-                start_price = prices[CLOSE_PRICE, i]
-        agg = np.array(aggregated).T if aggregated else np.zeros((7, 0))
-        closes = np.array(closes)
-        return agg, closes
-    agg, closes = aggregate_by_price_movement(prices, pip_threshold)
+    engine = RangeBarAggregator([pip_threshold])
+    engine.extend(prices)
+    agg = engine.bars(0)
+    closes = agg[CLOSE_PRICE].copy()
     ha = calc_HA(agg)
     zlema = zlema_ochl(ha[:4], zlema_window)
     return agg, ha, zlema, closes
@@ -395,38 +510,12 @@ def aggregate_ha_zlema_multi(prices, pip_thresholds, zlema_windows):
     Returns a dict keyed by (pip, window): {'agg', 'ha', 'zlema', 'closes'}
     """
     assert len(pip_thresholds) == len(zlema_windows)
-    n_candles = len(prices[0])
     results = {}
-    # For each threshold, track aggregation state
-    states = []
-    for pip in pip_thresholds:
-        states.append({
-            'start_idx': 0,
-            'start_price': prices[CLOSE_PRICE, 0],
-            'bars': [],
-            'closes': []
-        })
-    for i in range(1, n_candles):
-        for idx, pip in enumerate(pip_thresholds):
-            state = states[idx]
-            current_price = prices[CLOSE_PRICE, i]
-            price_change = abs(current_price - state['start_price']) * PIP
-            if price_change >= pip:
-                bar = np.zeros(7)
-                bar[OPEN_PRICE] = prices[OPEN_PRICE, state['start_idx']]
-                bar[CLOSE_PRICE] = prices[CLOSE_PRICE, i]
-                bar[HIGH_PRICE] = np.max(prices[HIGH_PRICE, state['start_idx']:i+1])
-                bar[LOW_PRICE] = np.min(prices[LOW_PRICE, state['start_idx']:i+1])
-                bar[VOLUME] = np.sum(prices[VOLUME, state['start_idx']:i+1])
-                bar[D_TIME] = prices[D_TIME, state['start_idx']]
-                bar[D_TIME_MOD] = prices[D_TIME_MOD, state['start_idx']]
-                state['bars'].append(bar)
-                state['closes'].append(prices[CLOSE_PRICE, i])
-                state['start_idx'] = i + 1
-                state['start_price'] = prices[CLOSE_PRICE, i]
+    engine = RangeBarAggregator(pip_thresholds)
+    engine.extend(prices)
     for idx, (pip, win) in enumerate(zip(pip_thresholds, zlema_windows)):
-        bars = np.array(states[idx]['bars']).T if states[idx]['bars'] else np.zeros((7, 0))
-        closes = np.array(states[idx]['closes'])
+        bars = engine.bars(idx)
+        closes = bars[CLOSE_PRICE].copy()
         ha = calc_HA(bars)
         zlema = zlema_ochl(ha[:4], win)
         results[(pip, win)] = {'agg': bars, 'ha': ha, 'zlema': zlema, 'closes': closes}
@@ -452,11 +541,9 @@ def zero_lag_trend_signals(ochl: np.ndarray, length: int = 70, mult: float = 1.2
     if ochl.shape[0] != 4:
         raise ValueError("ochl must have shape (4, N) -> [Open, Close, High, Low]")
 
-    open_p = ochl[OPEN_PRICE]
     close_p = ochl[CLOSE_PRICE]
     high_p = ochl[HIGH_PRICE]
     low_p = ochl[LOW_PRICE]
-    n = close_p.size
 
     # Effective lengths based on available bars
     n = close_p.size
@@ -470,12 +557,8 @@ def zero_lag_trend_signals(ochl: np.ndarray, length: int = 70, mult: float = 1.2
 
     # Volatility: highest(ATR(length), length*3) * mult
     atr_vals = atr(high_p, low_p, close_p, eff_len)
-    win = max(1, min(int(length * 3), n))
-    vol = np.full(n, np.nan)
-    for i in range(0, n):
-        start = 0 if i + 1 < win else i - win + 1
-        vol[i] = np.max(atr_vals[start:i + 1])
-    vol *= mult
+    vol = rolling_max(atr_vals, length * 3) * mult
+    valid = ~np.isnan(vol)
 
     upper = z + vol
     lower = z - vol
@@ -483,33 +566,28 @@ def zero_lag_trend_signals(ochl: np.ndarray, length: int = 70, mult: float = 1.2
     # Trend regime: Pine Script logic
     # if ta.crossover(close, zlema+volatility) -> trend := 1
     # if ta.crossunder(close, zlema-volatility) -> trend := -1
-    trend = np.zeros(n, dtype=int)
-    for i in range(1, n):
-        # Crossover: close crosses above upper band (zlema + volatility)
-        if (not np.isnan(vol[i]) and close_p[i - 1] <= (z[i - 1] + vol[i - 1]) and 
-            close_p[i] > (z[i] + vol[i])):
-            trend[i] = 1
-        # Crossunder: close crosses below lower band (zlema - volatility)  
-        elif (not np.isnan(vol[i]) and close_p[i - 1] >= (z[i - 1] - vol[i - 1]) and 
-              close_p[i] < (z[i] - vol[i])):
-            trend[i] = -1
-        else:
-            # Persist previous trend (var trend behavior from Pine)
-            trend[i] = trend[i - 1]
+    # otherwise the previous trend persists (var trend), i.e. a forward fill of the events
+    cross_up = valid[1:] & (close_p[:-1] <= upper[:-1]) & (close_p[1:] > upper[1:])
+    cross_dn = valid[1:] & ~cross_up & (close_p[:-1] >= lower[:-1]) & (close_p[1:] < lower[1:])
+    events = np.zeros(n, dtype=int)
+    events[1:][cross_up] = 1
+    events[1:][cross_dn] = -1
+    last_event = np.where(events != 0, np.arange(n), 0)
+    np.maximum.accumulate(last_event, out=last_event)
+    trend = events[last_event]
 
     # Entry signals: close cross ZLEMA while trend persists
     bull_entry = np.zeros(n, dtype=bool)
     bear_entry = np.zeros(n, dtype=bool)
-    for i in range(1, n):
-        co_up = close_p[i - 1] <= z[i - 1] and close_p[i] > z[i]
-        co_dn = close_p[i - 1] >= z[i - 1] and close_p[i] < z[i]
-        bull_entry[i] = co_up and (trend[i] == 1) and (trend[i - 1] == 1)
-        bear_entry[i] = co_dn and (trend[i] == -1) and (trend[i - 1] == -1)
+    co_up = (close_p[:-1] <= z[:-1]) & (close_p[1:] > z[1:])
+    co_dn = (close_p[:-1] >= z[:-1]) & (close_p[1:] < z[1:])
+    bull_entry[1:] = co_up & (trend[1:] == 1) & (trend[:-1] == 1)
+    bear_entry[1:] = co_dn & (trend[1:] == -1) & (trend[:-1] == -1)
 
     bull_entry_level = np.full(n, np.nan)
     bear_entry_level = np.full(n, np.nan)
-    mask_bull = bull_entry & ~np.isnan(vol)
-    mask_bear = bear_entry & ~np.isnan(vol)
+    mask_bull = bull_entry & valid
+    mask_bear = bear_entry & valid
     bull_entry_level[mask_bull] = z[mask_bull] - 1.5 * vol[mask_bull]
     bear_entry_level[mask_bear] = z[mask_bear] + 1.5 * vol[mask_bear]
 
@@ -518,20 +596,15 @@ def zero_lag_trend_signals(ochl: np.ndarray, length: int = 70, mult: float = 1.2
     # plotshape(ta.crossunder(trend, 0) ? zlema+volatility : na, "Bearish Trend", ...)
     trend_up_signal = np.zeros(n, dtype=bool)
     trend_down_signal = np.zeros(n, dtype=bool)
+    trend_up_signal[1:] = (trend[1:] == 1) & (trend[:-1] <= 0)
+    trend_down_signal[1:] = (trend[1:] == -1) & (trend[:-1] >= 0)
+
     trend_up_level = np.full(n, np.nan)
     trend_down_level = np.full(n, np.nan)
-    
-    for i in range(1, n):
-        # Crossover: trend crosses above 0 (trend changes to bullish)
-        if trend[i] == 1 and trend[i - 1] <= 0:
-            trend_up_signal[i] = True
-            if not np.isnan(vol[i]):
-                trend_up_level[i] = z[i] - vol[i]
-        # Crossunder: trend crosses below 0 (trend changes to bearish)
-        if trend[i] == -1 and trend[i - 1] >= 0:
-            trend_down_signal[i] = True
-            if not np.isnan(vol[i]):
-                trend_down_level[i] = z[i] + vol[i]
+    mask_up = trend_up_signal & valid
+    mask_down = trend_down_signal & valid
+    trend_up_level[mask_up] = lower[mask_up]
+    trend_down_level[mask_down] = upper[mask_down]
 
     return {
         'zlema': z,
@@ -574,36 +647,44 @@ def detect_support_resistance(prices, window=20, threshold=0.001, max_levels=10)
     
     for w in windows:
         w = max(3, min(w, n_periods//4))  # Ensure valid window size
-        
-        for i in range(w, n_periods - w):
-            # Resistance (local maxima) - more lenient condition
-            if (highs[i] >= max(highs[i-w:i]) and 
-                highs[i] >= max(highs[i+1:i+w+1])):
-                resistance_levels.append((i, highs[i], w))
-            
-            # Support (local minima) - more lenient condition
-            if (lows[i] <= min(lows[i-w:i]) and 
-                lows[i] <= min(lows[i+1:i+w+1])):
-                support_levels.append((i, lows[i], w))
+        if n_periods - w <= w:
+            continue
+
+        # Trailing extrema: max(highs[i-w:i]) is high_max[i-1], max(highs[i+1:i+w+1]) is high_max[i+w]
+        high_max = rolling_max(highs, w)
+        low_min = rolling_min(lows, w)
+        idx = np.arange(w, n_periods - w)
+
+        # Resistance (local maxima) - more lenient condition
+        is_peak = (highs[idx] >= high_max[idx - 1]) & (highs[idx] >= high_max[idx + w])
+        resistance_levels.extend((i, highs[i], w) for i in idx[is_peak].tolist())
+
+        # Support (local minima) - more lenient condition
+        is_trough = (lows[idx] <= low_min[idx - 1]) & (lows[idx] <= low_min[idx + w])
+        support_levels.extend((i, lows[i], w) for i in idx[is_trough].tolist())
     
     # Method 2: Horizontal levels (price levels that were touched multiple times)
     # Find price levels that were tested multiple times
     price_bins = 50
     high_range = np.max(highs) - np.min(highs)
     
+    touch_range = high_range * 0.015
+
     # Test resistance levels (more percentiles for more levels)
-    for percentile in [95, 90, 85, 80, 75, 70, 65, 60, 55, 50]:
-        level = np.percentile(highs, percentile)
-        touches = sum(1 for h in highs if abs(h - level) <= high_range * 0.015)
-        if touches >= 1:  # More lenient - level touched at least once
-            resistance_levels.append((0, level, touches + percentile/100))  # Add percentile weight
-    
+    percentiles = [95, 90, 85, 80, 75, 70, 65, 60, 55, 50]
+    levels = np.percentile(highs, percentiles)
+    touches = np.count_nonzero(np.abs(highs[None, :] - levels[:, None]) <= touch_range, axis=1)
+    for percentile, level, count in zip(percentiles, levels, touches.tolist()):
+        if count >= 1:  # More lenient - level touched at least once
+            resistance_levels.append((0, level, count + percentile/100))  # Add percentile weight
+
     # Test support levels (more percentiles for more levels)
-    for percentile in [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]:
-        level = np.percentile(lows, percentile)
-        touches = sum(1 for l in lows if abs(l - level) <= high_range * 0.015)
-        if touches >= 1:  # More lenient - level touched at least once
-            support_levels.append((0, level, touches + (100-percentile)/100))  # Add percentile weight
+    percentiles = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
+    levels = np.percentile(lows, percentiles)
+    touches = np.count_nonzero(np.abs(lows[None, :] - levels[:, None]) <= touch_range, axis=1)
+    for percentile, level, count in zip(percentiles, levels, touches.tolist()):
+        if count >= 1:  # More lenient - level touched at least once
+            support_levels.append((0, level, count + (100-percentile)/100))  # Add percentile weight
     
     # Method 3: Round number levels (psychological levels)
     current_price = closes[-1]
@@ -614,11 +695,12 @@ def detect_support_resistance(prices, window=20, threshold=0.001, max_levels=10)
         # For forex pairs - use smaller increments for more levels
         increment = 0.0005 if price_range < 0.1 else 0.001
         base = round(current_price, 4)
+        lowest, highest = np.min(lows), np.max(highs)
         
         # Generate more round number levels
         for i in range(-50, 51):
             level = base + (i * increment)
-            if np.min(lows) <= level <= np.max(highs):
+            if lowest <= level <= highest:
                 # Add psychological strength based on round number significance
                 strength = 3 if i % 10 == 0 else 2 if i % 5 == 0 else 1
                 if level > current_price:
@@ -631,21 +713,18 @@ def detect_support_resistance(prices, window=20, threshold=0.001, max_levels=10)
         if not levels:
             return []
             
-        # Remove very close levels
+        # Remove very close levels with one sweep in price order. Kept levels stay at
+        # least `threshold` apart, so the only one that can be within `threshold` of
+        # the next (higher) price is the last one kept.
         unique_levels = []
         sorted_levels = sorted(levels, key=lambda x: x[1])
         
         for idx, price, strength in sorted_levels:
-            too_close = False
-            for existing in unique_levels:
-                if abs(price - existing[1]) < threshold:
-                    # Keep the stronger level
-                    if strength > existing[2]:
-                        unique_levels.remove(existing)
-                        unique_levels.append((idx, price, strength))
-                    too_close = True
-                    break
-            if not too_close:
+            if unique_levels and abs(price - unique_levels[-1][1]) < threshold:
+                # Keep the stronger level
+                if strength > unique_levels[-1][2]:
+                    unique_levels[-1] = (idx, price, strength)
+            else:
                 unique_levels.append((idx, price, strength))
         
         # Sort by strength (higher is better) and take top levels
@@ -671,20 +750,63 @@ def cluster_levels(levels, threshold):
     if not levels:
         return []
     
-    clusters = []
-    sorted_levels = sorted(levels)
-    
-    current_cluster = [sorted_levels[0]]
-    
-    for level in sorted_levels[1:]:
-        if abs(level - current_cluster[-1]) <= threshold:
-            current_cluster.append(level)
-        else:
-            clusters.append(np.mean(current_cluster))
-            current_cluster = [level]
-    
-    clusters.append(np.mean(current_cluster))
-    return clusters
+    # Sorted sweep: a new cluster starts wherever the gap to the previous level exceeds threshold
+    sorted_levels = np.sort(np.asarray(levels, dtype=float))
+    breaks = np.flatnonzero(np.diff(sorted_levels) > threshold) + 1
+    return [np.mean(cluster) for cluster in np.split(sorted_levels, breaks)]
+
+def merge_levels(candidates, thresholds, levels=None, same_type=False):
+    """
+    Merge level candidates into a list of distinct levels.
+
+    Candidates are taken in order. Each one is absorbed by the earliest kept level
+    (in list order) closer than its type's threshold; if the candidate has the higher
+    confidence it replaces that level and moves to the end of the list. Otherwise the
+    candidate is appended. Kept levels sit in a price-sorted index, so each candidate
+    only looks at the few levels within reach instead of scanning the whole list.
+
+    Args:
+        candidates: Dicts with 'price', 'type' and 'confidence' keys.
+        thresholds: Merge distance in pips, either one number or a dict keyed by type.
+        levels: Already merged levels to continue from (not modified).
+        same_type: Only merge candidates into levels of the same type.
+
+    Returns:
+        list: The merged levels.
+    """
+    kept = {}  # sequence number -> level, list order is ascending sequence
+    index = []  # sorted (price, sequence) pairs
+    for seq, level in enumerate(levels or []):
+        kept[seq] = level
+        bisect.insort(index, (level['price'], seq))
+    next_seq = len(kept)
+
+    for level in candidates:
+        price = level['price']
+        pips = thresholds[level['type']] if isinstance(thresholds, dict) else thresholds
+        reach = pips / PIP * (1 + 1e-6) + 1e-12  # slightly wide, exact test below
+
+        match = None
+        lo = bisect.bisect_left(index, (price - reach, -1))
+        hi = bisect.bisect_right(index, (price + reach, next_seq))
+        for existing_price, seq in index[lo:hi]:
+            existing = kept[seq]
+            if same_type and existing['type'] != level['type']:
+                continue
+            if abs(price - existing_price) * PIP < pips and (match is None or seq < match):
+                match = seq
+
+        if match is not None:
+            # Keep the one with higher confidence
+            if level['confidence'] <= kept[match]['confidence']:
+                continue
+            index.pop(bisect.bisect_left(index, (kept.pop(match)['price'], match)))
+
+        kept[next_seq] = level
+        bisect.insort(index, (price, next_seq))
+        next_seq += 1
+
+    return [kept[seq] for seq in sorted(kept)]
 
 def fibonacci_levels(high, low, levels=[0.236, 0.382, 0.5, 0.618, 0.786]):
     """
@@ -768,6 +890,32 @@ def pivot_points(prices, method='standard'):
             'l5': close - 1.618 * diff
         }
 
+def _profile_bins(prices, edges):
+    """Bin index of each price; prices at or above the last edge fall outside (-1)."""
+    idx = np.digitize(prices, edges) - 1
+    idx[idx >= len(edges) - 1] = -1
+    return idx
+
+def _bin_volume(prices, volume, bins):
+    """Bin edges spanning the prices and the volume traded in each bin."""
+    price_range = np.linspace(prices.min(), prices.max(), bins)
+    idx = _profile_bins(prices, price_range)
+    inside = idx >= 0
+    return price_range, np.bincount(idx[inside], weights=volume[inside], minlength=bins - 1)
+
+def _profile_summary(price_range, volume_profile):
+    """Levels dict shared by volume_profile_levels and VolumeProfile."""
+    # Find high-volume nodes
+    threshold = np.percentile(volume_profile, 80)
+    high_volume_levels = price_range[:-1][volume_profile > threshold]
+    
+    return {
+        'price_levels': price_range[:-1],
+        'volume_profile': volume_profile,
+        'high_volume_levels': high_volume_levels,
+        'poc': price_range[:-1][np.argmax(volume_profile)]  # Point of Control
+    }
+
 def volume_profile_levels(prices, volume, bins=50):
     """
     Calculate volume profile to identify high-volume price levels.
@@ -780,26 +928,120 @@ def volume_profile_levels(prices, volume, bins=50):
     Returns:
         dict: Volume profile data
     """
-    price_range = np.linspace(prices.min(), prices.max(), bins)
-    volume_profile = np.zeros(bins-1)
-    
-    for i in range(len(prices)):
-        bin_idx = np.digitize(prices[i], price_range) - 1
-        if 0 <= bin_idx < len(volume_profile):
-            volume_profile[bin_idx] += volume[i]
-    
-    # Find high-volume nodes
-    threshold = np.percentile(volume_profile, 80)
-    high_volume_levels = price_range[:-1][volume_profile > threshold]
-    
-    return {
-        'price_levels': price_range[:-1],
-        'volume_profile': volume_profile,
-        'high_volume_levels': high_volume_levels,
-        'poc': price_range[:-1][np.argmax(volume_profile)]  # Point of Control
-    }
+    prices = np.asarray(prices, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    price_range, volume_profile = _bin_volume(prices, volume, bins)
+    return _profile_summary(price_range, volume_profile)
+
+def volume_profile_multi(prices, volume, lookbacks, bins=50):
+    """
+    Volume profiles for several lookbacks (e.g. a day, a week and a month of candles).
+
+    Each profile equals volume_profile_levels(prices[-lookback:], volume[-lookback:], bins).
+    The range of every lookback comes from one reverse min/max sweep and all profiles
+    are accumulated by a single bincount over stacked bin indices.
+
+    Args:
+        prices: Close prices
+        volume: Volume data
+        lookbacks: Numbers of most recent candles to profile (longer than the
+            series profiles the whole series)
+        bins: Number of price bins
 
-def key_levels_composite(prices, volume, window=20, threshold=0.001):
+    Returns:
+        dict: requested lookback -> volume profile data
+    """
+    prices = np.asarray(prices, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    requested = [int(lb) for lb in lookbacks]
+    if any(lb < 1 for lb in requested):
+        raise ValueError(f"lookbacks must be at least 1, got {list(lookbacks)}")
+    lookbacks = [min(lb, len(prices)) for lb in requested]
+    
+    # Suffix extremes: suffix_min[k] = min(prices[-(k + 1):])
+    suffix_min = np.minimum.accumulate(prices[::-1])
+    suffix_max = np.maximum.accumulate(prices[::-1])
+    
+    ranges, indices, weights = [], [], []
+    for k, lookback in enumerate(lookbacks):
+        price_range = np.linspace(suffix_min[lookback - 1], suffix_max[lookback - 1], bins)
+        idx = _profile_bins(prices[-lookback:], price_range)
+        inside = idx >= 0
+        ranges.append(price_range)
+        indices.append(idx[inside] + k * (bins - 1))
+        weights.append(volume[-lookback:][inside])
+    
+    profiles = np.bincount(np.concatenate(indices), weights=np.concatenate(weights),
+                           minlength=len(lookbacks) * (bins - 1)).reshape(len(lookbacks), bins - 1)
+    return {lookback: _profile_summary(ranges[k], profiles[k]) for k, lookback in enumerate(requested)}
+
+class VolumeProfile:
+    """
+    Volume profile that grows one candle at a time.
+
+    Appending a candle inside the current price range adds its volume to one bin.
+    A candle that extends the range changes every bin edge, so the profile is
+    rebuilt from the stored history (one digitize + bincount).
+
+    Example:
+        profile = VolumeProfile(closes[:-1], volumes[:-1])
+        profile.append(closes[-1], volumes[-1])
+        levels = profile.levels()  # same as volume_profile_levels(closes, volumes)
+    """
+
+    def __init__(self, prices, volume, bins: int = 50):
+        self.bins = bins
+        self.count = 0
+        self._prices = np.empty(max(16, len(prices)))
+        self._volume = np.empty(len(self._prices))
+        self._extend_storage(prices, volume)
+        self._rebuild()
+
+    def _extend_storage(self, prices, volume):
+        prices = np.asarray(prices, dtype=float).ravel()
+        volume = np.asarray(volume, dtype=float).ravel()
+        end = self.count + len(prices)
+        if end > len(self._prices):
+            capacity = max(end, 2 * len(self._prices))
+            self._prices = np.resize(self._prices, capacity)
+            self._volume = np.resize(self._volume, capacity)
+        self._prices[self.count:end] = prices
+        self._volume[self.count:end] = volume
+        self.count = end
+
+    def _rebuild(self):
+        if self.count == 0:
+            self.price_range = np.zeros(self.bins)
+            self.volume_profile = np.zeros(self.bins - 1)
+            return
+        self.price_range, self.volume_profile = _bin_volume(
+            self._prices[:self.count], self._volume[:self.count], self.bins)
+
+    def append(self, price: float, volume: float):
+        """Add one candle's close price and volume."""
+        self.extend([price], [volume])
+
+    def extend(self, prices, volume):
+        """Add several candles at once."""
+        prices = np.asarray(prices, dtype=float).ravel()
+        if len(prices) == 0:
+            return
+        if self.count == 0 or prices.min() < self.price_range[0] or prices.max() > self.price_range[-1]:
+            self._extend_storage(prices, volume)
+            self._rebuild()
+            return
+        volume = np.asarray(volume, dtype=float).ravel()
+        self._extend_storage(prices, volume)
+        idx = _profile_bins(prices, self.price_range)
+        inside = idx >= 0
+        # Sequential in-order accumulation keeps the sums identical to a full rebuild
+        np.add.at(self.volume_profile, idx[inside], volume[inside])
+
+    def levels(self) -> dict:
+        """Profile summary in the format of volume_profile_levels."""
+        return _profile_summary(self.price_range, self.volume_profile.copy())
+
+def key_levels_composite(prices, volume, window=20, threshold=0.001, volume_bins=50):
     """
     Composite key level detection combining multiple methods.
     
@@ -815,7 +1057,7 @@ def key_levels_composite(prices, volume, window=20, threshold=0.001):
     pivots_camarilla = pivot_points(prices, 'camarilla')
     
     # Volume profile
-    vol_profile = volume_profile_levels(prices[CLOSE_PRICE], volume)
+    vol_profile = volume_profile_levels(prices[CLOSE_PRICE], volume, bins=volume_bins)
     
     # Fibonacci levels - use entire data period for more meaningful levels
     high = np.max(prices[HIGH_PRICE, :])  # Use all data
@@ -875,44 +1117,15 @@ def key_levels_composite(prices, volume, window=20, threshold=0.001):
             all_levels.append({'price': float(fib_levels[key]), 'type': 'fibonacci', 'confidence': confidence})
     
     # Minimal clustering - preserve almost all support/resistance levels
-    clustered_levels = []
-    
-    # First, add all support and resistance levels with minimal clustering
     sr_levels_only = [l for l in all_levels if l['type'] in ['support', 'resistance']]
     other_levels = [l for l in all_levels if l['type'] not in ['support', 'resistance']]
     
     # For S/R levels, only cluster if they're extremely close (less than 0.1 pip)
-    for level in sr_levels_only:
-        too_close = False
-        for existing in clustered_levels:
-            if (existing['type'] == level['type'] and 
-                abs(level['price'] - existing['price']) * 10000 < 0.1):  # 0.1 pip threshold
-                # Keep the one with higher confidence
-                if level['confidence'] > existing['confidence']:
-                    clustered_levels.remove(existing)
-                    clustered_levels.append(level)
-                too_close = True
-                break
-        if not too_close:
-            clustered_levels.append(level)
-    
-    # For other levels, use normal clustering
-    for level in other_levels:
-        too_close = False
-        for existing in clustered_levels:
-            if level['type'] in ['fibonacci', 'volume']:
-                distance_threshold = 0.5  # 0.5 pips
-            else:  # pivots
-                distance_threshold = 1.0  # 1 pip
-                
-            if abs(level['price'] - existing['price']) * 10000 < distance_threshold:
-                if level['confidence'] > existing['confidence']:
-                    clustered_levels.remove(existing)
-                    clustered_levels.append(level)
-                too_close = True
-                break
-        if not too_close:
-            clustered_levels.append(level)
+    clustered_levels = merge_levels(sr_levels_only, 0.1, same_type=True)
+    
+    # For other levels, use normal clustering against everything kept so far
+    clustered_levels = merge_levels(other_levels, {'fibonacci': 0.5, 'volume': 0.5, 'pivots': 1.0},
+                                    levels=clustered_levels)
     
     return {
         'levels': clustered_levels,
@@ -0,0 +1,147 @@
+import numpy as np
+
+OPEN_PRICE = 0
+CLOSE_PRICE = 1
+HIGH_PRICE = 2
+LOW_PRICE = 3
+VOLUME = 4
+D_TIME = 5
+D_TIME_MOD = 6
+PIP = 10000
+
+BAR_ROWS = 7
+
+
+class _BarSeries:
+    """Closed bars and the still-open bar for one pip threshold."""
+
+    def __init__(self, pip_threshold: float):
+        self.pip_threshold = pip_threshold
+        self.ref_price = None  # close of the last closed bar (or of the first candle)
+        self.open_bar = None  # running O/C/H/L/V/time of the open bar, None if it has no candles
+        self.bars = np.zeros((BAR_ROWS, 64))
+        self.count = 0
+
+    def append(self, new_bars: np.ndarray):
+        end = self.count + new_bars.shape[1]
+        if end > self.bars.shape[1]:
+            grown = np.zeros((BAR_ROWS, max(end, 2 * self.bars.shape[1])))
+            grown[:, :self.count] = self.bars[:, :self.count]
+            self.bars = grown
+        self.bars[:, self.count:end] = new_bars
+        self.count = end
+
+
+def _find_bar_ends(closes: np.ndarray, start: int, ref_price: float, pip_threshold: float):
+    """
+    Indices where a bar closes: the first candle whose close is pip_threshold pips away
+    from the reference price, which then becomes that candle's close.
+
+    Long bars are found with vectorized scans over chunks sized from the last bar
+    length; short bars (a few candles each) are cheaper to step through directly.
+    """
+    ends = []
+    n = len(closes)
+    values = closes.tolist()
+    bar_len = 1
+    pos = start
+    while pos < n:
+        end = None
+        if bar_len < 32:
+            for i in range(pos, min(n, pos + 64)):
+                if abs(values[i] - ref_price) * PIP >= pip_threshold:
+                    end = i
+                    break
+            scanned = min(n, pos + 64) - pos
+        else:
+            seg = closes[pos:pos + 2 * bar_len]
+            hit = np.abs(seg - ref_price) * PIP >= pip_threshold
+            if hit.any():
+                end = pos + int(hit.argmax())
+            scanned = len(seg)
+        if end is None:
+            pos += scanned
+            bar_len = max(bar_len, 2 * scanned)
+            continue
+        ends.append(end)
+        bar_len = end + 1 - pos
+        ref_price = values[end]
+        pos = end + 1
+    return ends, ref_price
+
+
+class RangeBarAggregator:
+    """
+    Price-movement (range) bars for several pip thresholds, fed incrementally.
+
+    A bar closes on the first candle whose close has moved at least `pip` pips from
+    the previous bar's close. Bars carry the open of their first candle, the close of
+    the last, the high/low extremes, summed volume and the first candle's time rows,
+    exactly as aggregate_ha_zlema builds them. The bar still forming at the end of the
+    data is kept as running aggregates and completed by later calls to extend.
+
+    Example:
+        engine = RangeBarAggregator([10, 20, 50])
+        engine.extend(history)
+        engine.extend(new_candles)
+        bars_10 = engine.bars(0)
+    """
+
+    def __init__(self, pip_thresholds):
+        self.pip_thresholds = list(pip_thresholds)
+        self.series = [_BarSeries(pip) for pip in self.pip_thresholds]
+        self.count = 0  # candles consumed
+
+    def extend(self, prices: np.ndarray) -> list:
+        """
+        Feed candles in the 7-row layout (Open, Close, High, Low, Volume, Time, Time mod).
+
+        Returns:
+            list: Number of bars closed per threshold by these candles.
+        """
+        prices = np.asarray(prices, dtype=float)
+        n = prices.shape[1]
+        if n == 0:
+            return [0] * len(self.series)
+
+        closes = prices[CLOSE_PRICE]
+        first_call = self.count == 0
+        self.count += n
+
+        new_counts = []
+        for series in self.series:
+            if first_call:
+                series.ref_price = closes[0]
+            # The very first candle opens a bar but cannot close one
+            ends, series.ref_price = _find_bar_ends(closes, 1 if first_call else 0,
+                                                    series.ref_price, series.pip_threshold)
+
+            # Segments: closed bars, then the remainder that stays open
+            starts = np.array([0] + [e + 1 for e in ends if e + 1 < n])
+            segs = np.empty((BAR_ROWS, len(starts)))
+            segs[OPEN_PRICE] = prices[OPEN_PRICE, starts]
+            segs[CLOSE_PRICE] = closes[np.append(starts[1:] - 1, n - 1)]
+            segs[HIGH_PRICE] = np.maximum.reduceat(prices[HIGH_PRICE], starts)
+            segs[LOW_PRICE] = np.minimum.reduceat(prices[LOW_PRICE], starts)
+            segs[VOLUME] = np.add.reduceat(prices[VOLUME], starts)
+            segs[D_TIME] = prices[D_TIME, starts]
+            segs[D_TIME_MOD] = prices[D_TIME_MOD, starts]
+
+            # Fold the bar left open by the previous call into the first segment
+            if series.open_bar is not None:
+                carried = series.open_bar
+                segs[HIGH_PRICE, 0] = max(carried[HIGH_PRICE], segs[HIGH_PRICE, 0])
+                segs[LOW_PRICE, 0] = min(carried[LOW_PRICE], segs[LOW_PRICE, 0])
+                segs[VOLUME, 0] += carried[VOLUME]
+                for row in (OPEN_PRICE, D_TIME, D_TIME_MOD):
+                    segs[row, 0] = carried[row]
+
+            series.append(segs[:, :len(ends)])
+            series.open_bar = segs[:, len(ends)].copy() if len(starts) > len(ends) else None
+            new_counts.append(len(ends))
+        return new_counts
+
+    def bars(self, idx: int = 0) -> np.ndarray:
+        """Closed bars for threshold number idx, shape (7, n_bars)."""
+        series = self.series[idx]
+        return series.bars[:, :series.count]
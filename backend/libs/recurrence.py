@@ -0,0 +1,57 @@
+import numpy as np
+from scipy import signal
+
+
+def first_order(x: np.ndarray, gain: float, decay: float, initial=0.0, axis: int = -1) -> np.ndarray:
+    """
+    First-order IIR recurrence y[n] = gain * x[n] + decay * y[n-1] along one axis.
+
+    Runs as a single lfilter call, which evaluates exactly that expression per
+    element, so results match the equivalent Python loop bit for bit.
+
+    Args:
+        x (np.ndarray): Input of any shape.
+        gain (float): Weight of the new input.
+        decay (float): Weight of the previous output.
+        initial: State before the first element (y[-1]), a scalar or an array
+            broadcastable to x without `axis`.
+        axis (int): Axis to run the recurrence along.
+
+    Returns:
+        np.ndarray: y, same shape as x.
+    """
+    x = np.asarray(x, dtype=float)
+    axis = axis % x.ndim
+    if x.shape[axis] == 0:
+        return np.zeros_like(x)
+
+    state_shape = x.shape[:axis] + (1,) + x.shape[axis + 1:]
+    initial = np.expand_dims(np.broadcast_to(initial, x.shape[:axis] + x.shape[axis + 1:]), axis)
+    y, _ = signal.lfilter([gain], [1, -decay], x, axis=axis,
+                          zi=np.broadcast_to(decay * initial, state_shape))
+    return y
+
+
+def seeded_ema(x: np.ndarray, alpha: float, seed=None, axis: int = -1) -> np.ndarray:
+    """
+    EMA y[n] = alpha * x[n] + (1 - alpha) * y[n-1] whose first value is the seed.
+
+    Args:
+        x (np.ndarray): Input of any shape.
+        alpha (float): Smoothing factor.
+        seed: First output value(s); defaults to the first input along `axis`.
+        axis (int): Axis to run along.
+
+    Returns:
+        np.ndarray: EMA values, same shape as x.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.moveaxis(np.zeros_like(x), axis, -1)
+    if y.shape[-1] == 0:
+        return np.moveaxis(y, -1, axis)
+
+    x_last = np.moveaxis(x, axis, -1)
+    y[..., 0] = x_last[..., 0] if seed is None else seed
+    if y.shape[-1] > 1:
+        y[..., 1:] = first_order(x_last[..., 1:], alpha, 1 - alpha, initial=y[..., 0])
+    return np.moveaxis(y, -1, axis)
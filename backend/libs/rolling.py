@@ -0,0 +1,84 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import ndimage
+
+OPEN_PRICE = 0
+CLOSE_PRICE = 1
+
+
+def _trailing_windows(x: np.ndarray, win: int) -> np.ndarray:
+    """Windows x[..., n-win:n] for n in [win, N), shape (..., N - win, win)."""
+    return sliding_window_view(x, win, axis=-1)[..., :-1, :]
+
+
+def rolling_rsi(candles: np.ndarray, win: int) -> np.ndarray:
+    """
+    Candle-body RSI over a trailing window, for one candle set or a whole stack.
+
+    Matches calc_rsi: value n uses the bodies (close - open) of candles
+    n-win .. n-1, and the first `win` values are 1.0.
+
+    Args:
+        candles (np.ndarray): OCHL candles of shape (R, N) or (P, R, N).
+        win (int): Window length.
+
+    Returns:
+        np.ndarray: RSI values of shape (N,) or (P, N).
+    """
+    candles = np.asarray(candles, dtype=float)
+    rsi = np.ones(candles.shape[:-2] + candles.shape[-1:])
+    if candles.shape[-1] <= win:
+        return rsi
+
+    bodies = _trailing_windows(candles[..., CLOSE_PRICE, :] - candles[..., OPEN_PRICE, :], win)
+    gains = np.where(bodies > 0, bodies, 0).sum(axis=-1)
+    losses = np.where(bodies < 0, -bodies, 0).sum(axis=-1)
+    rs = gains / (losses + 0.000000000000000000000001)
+    rsi[..., win:] = 100 - (100 / (1 + rs))
+    return rsi
+
+
+def rolling_efficiency(candles: np.ndarray, win: int) -> np.ndarray:
+    """
+    Market efficiency (net move over summed body lengths) for a candle set or stack.
+
+    Matches market_eff: value n is (close[n] - open[n-win]) divided by the summed
+    absolute bodies of candles n-win .. n-1, clipped to [-1, 1]. The first `win`
+    values are 0.
+
+    Args:
+        candles (np.ndarray): OCHL candles of shape (R, N) or (P, R, N).
+        win (int): Window length.
+
+    Returns:
+        np.ndarray: Efficiency values of shape (N,) or (P, N).
+    """
+    candles = np.asarray(candles, dtype=float)
+    eff = np.zeros(candles.shape[:-2] + candles.shape[-1:])
+    if candles.shape[-1] <= win:
+        return eff
+
+    close_p = candles[..., CLOSE_PRICE, :]
+    open_p = candles[..., OPEN_PRICE, :]
+    path = np.abs(_trailing_windows(close_p - open_p, win)).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eff[..., win:] = (close_p[..., win:] - open_p[..., :-win]) / path
+    return np.clip(eff, -1, 1)
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing maximum: out[i] = max(values[max(0, i - window + 1):i + 1]).
+
+    Uses scipy's monotonic-queue maximum filter, so the cost is O(N) regardless of
+    the window length. Edge padding repeats values[0], which every partial window
+    at the start already contains.
+    """
+    window = max(1, min(int(window), len(values)))
+    return ndimage.maximum_filter1d(values, size=window, mode='nearest', origin=(window - 1) // 2)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing minimum, the counterpart of rolling_max."""
+    window = max(1, min(int(window), len(values)))
+    return ndimage.minimum_filter1d(values, size=window, mode='nearest', origin=(window - 1) // 2)
@@ -0,0 +1,82 @@
+"""
+Request coalescing ("single flight") for read-only exchange calls.
+
+Concurrent callers asking for the same key share one in-flight call and its
+result (or exception). With a TTL, a finished result is also reused by callers
+arriving within that many seconds. Results are shared objects: do not mutate them.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key."""
+
+    def __init__(self, ttl: float = 0.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self.requests = 0  # calls to do()
+        self.executed = 0  # calls that actually ran
+        self.coalesced = 0  # calls that joined an in-flight call
+        self.cache_hits = 0  # calls served from the TTL cache
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless an identical call is in flight or cached."""
+        with self._lock:
+            self.requests += 1
+            if self.ttl > 0 and key in self._results:
+                finished_at, result = self._results[key]
+                if time.monotonic() - finished_at < self.ttl:
+                    self.cache_hits += 1
+                    return result
+                del self._results[key]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if self.ttl > 0 and call.error is None:
+                    now = time.monotonic()
+                    self._results = {k: v for k, v in self._results.items() if now - v[0] < self.ttl}
+                    self._results[key] = (now, call.result)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "executed": self.executed,
+                "deduplicated": self.coalesced + self.cache_hits,
+                "coalesced_in_flight": self.coalesced,
+                "ttl_hits": self.cache_hits,
+                "in_flight": len(self._inflight),
+                "ttl_seconds": self.ttl,
+            }
@@ -0,0 +1,128 @@
+"""
+Synthetic OHLCV candles for benchmarks and stress tests.
+
+Prices follow geometric Brownian motion whose drift and volatility switch
+between regimes (a Markov chain with geometric regime durations), with
+occasional opening gaps. Output uses the 7-row parse_prices layout (open,
+close, high, low, volume, d_time, dow) on a regular candle grid, optionally
+skipping weekends like the FX market. Every step is vectorized: a million
+candles take a fraction of a second and ten million a few seconds.
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# (annualized drift, volatility multiplier) of the default regimes: calm, trending up, trending down, volatile
+DEFAULT_REGIMES = ((0.0, 0.6), (0.3, 1.0), (-0.3, 1.0), (0.0, 2.5))
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def candle_times(n: int, seconds: int = 300, start: str = '2024-01-01T00:00:00',
+                 skip_weekends: bool = True) -> np.ndarray:
+    """
+    Open times of n consecutive candles.
+
+    Args:
+        n (int): Number of candles.
+        seconds (int): Candle length in seconds.
+        start (str): First candle time (UTC); moved forward past a weekend if needed.
+        skip_weekends (bool): Leave out Saturdays and Sundays.
+
+    Returns:
+        np.ndarray: datetime64[s] times, ascending.
+    """
+    origin = np.datetime64(start, 's')
+    if not skip_weekends:
+        return origin + np.arange(n, dtype=np.int64) * np.timedelta64(seconds, 's')
+
+    per_day = max(1, 86400 // seconds)
+    # Enough calendar candles for n trading ones, then keep the weekdays
+    total = (n // (5 * per_day) + 2) * 7 * per_day
+    times = origin + np.arange(total, dtype=np.int64) * np.timedelta64(seconds, 's')
+    weekday = (times.astype('datetime64[D]').astype(np.int64) + 3) % 7 < 5
+    return times[weekday][:n]
+
+
+def _regime_path(rng: np.random.Generator, n: int, n_regimes: int, mean_duration: float) -> np.ndarray:
+    """Regime index of every candle: a Markov chain that always switches to a different regime."""
+    if n_regimes == 1:
+        return np.zeros(n, dtype=np.intp)
+    durations = []
+    covered = 0
+    while covered < n:
+        chunk = rng.geometric(1.0 / mean_duration, size=int(n / mean_duration) + 16)
+        durations.append(chunk)
+        covered += int(chunk.sum())
+    durations = np.concatenate(durations)
+    labels = (rng.integers(0, n_regimes) + np.cumsum(rng.integers(1, n_regimes, size=len(durations)))) % n_regimes
+    return np.repeat(labels, durations)[:n]
+
+
+def generate_candles(n: int, seed: Optional[int] = None, start_price: float = 1.25,
+                     volatility: float = 0.08, seconds: int = 300,
+                     regimes: Sequence[Tuple[float, float]] = DEFAULT_REGIMES,
+                     mean_regime_candles: float = 500, gap_probability: float = 0.002,
+                     gap_size: float = 5.0, base_volume: float = 200,
+                     start: str = '2024-01-01T00:00:00', skip_weekends: bool = True,
+                     with_times: bool = False):
+    """
+    Regime-switching GBM candles in the 7-row parse_prices layout.
+
+    Args:
+        n (int): Number of candles (millions are fine).
+        seed (int): Random seed; the same seed gives the same candles.
+        start_price (float): Open of the first candle.
+        volatility (float): Annualized volatility of the base regime.
+        seconds (int): Candle length in seconds (300 for M5).
+        regimes: (annualized drift, volatility multiplier) per regime.
+        mean_regime_candles (float): Average regime length in candles.
+        gap_probability (float): Chance that a candle opens away from the previous close.
+        gap_size (float): Gap standard deviation in multiples of the candle volatility.
+        base_volume (float): Median candle volume in the base regime.
+        start (str): First candle time (UTC).
+        skip_weekends (bool): Leave out Saturdays and Sundays, like the FX market.
+        with_times (bool): Also return the candle open times.
+
+    Returns:
+        np.ndarray: Candles of shape (7, n); with with_times=True a tuple
+        (candles, times) where times is datetime64[s].
+    """
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    if n == 0:
+        candles = np.zeros((7, 0))
+        return (candles, candle_times(0, seconds, start, skip_weekends)) if with_times else candles
+    rng = np.random.default_rng(seed)
+    dt = seconds / SECONDS_PER_YEAR
+    drift, vol_mult = np.asarray(regimes, dtype=float).T
+    regime = _regime_path(rng, n, len(drift), mean_regime_candles)
+    sigma = volatility * np.sqrt(dt) * vol_mult[regime]  # per-candle log-return std
+
+    # Log returns of the candle bodies plus opening gaps
+    body = (drift[regime] * dt - 0.5 * sigma ** 2) + sigma * rng.standard_normal(n)
+    gap = np.where(rng.random(n) < gap_probability, gap_size * sigma * rng.standard_normal(n), 0.0)
+    gap[0] = 0.0
+
+    candles = np.empty((7, n))
+    log_close = np.cumsum(body + gap)
+    candles[1] = np.exp(log_close)
+    candles[0] = np.exp(log_close - body)
+    candles[:2] *= start_price
+
+    # Wicks beyond the body, scaled by the candle volatility
+    top = np.maximum(candles[0], candles[1])
+    bottom = np.minimum(candles[0], candles[1])
+    candles[2] = top * np.exp(np.abs(rng.standard_normal(n)) * sigma * 0.5)
+    candles[3] = bottom * np.exp(-np.abs(rng.standard_normal(n)) * sigma * 0.5)
+    del top, bottom
+
+    # Volume grows with volatility and with the size of the move
+    candles[4] = np.round(base_volume * vol_mult[regime] * rng.lognormal(0.0, 0.5, n)
+                          * (1 + np.abs(body) / np.maximum(sigma, 1e-12) / 2)) + 1
+
+    times = candle_times(n, seconds, start, skip_weekends)
+    days = times.astype('datetime64[D]')
+    secs = (times - days).astype(np.int64)
+    candles[5] = (secs // 3600) + (secs // 60 % 60) / 100 + (secs % 60) / 10000
+    candles[6] = (days.astype(np.int64) + 3) % 7
+    return (candles, times) if with_times else candles
@@ -1,5 +1,6 @@
 import numpy as np
-import time, requests
+import time, requests, threading
+from concurrent.futures import ThreadPoolExecutor
 from oandapyV20 import API
 from oandapyV20.endpoints.orders import OrderCreate
 from oandapyV20.endpoints.trades import TradeClose, TradeDetails,TradeCRCDO, TradesList
@@ -7,9 +8,14 @@ from oandapyV20.endpoints.positions import PositionClose
 from oandapyV20.endpoints.instruments import InstrumentsCandles as get_prices
 from oandapyV20.endpoints.accounts import AccountInstruments, AccountSummary
 from oandapyV20.contrib.factories import InstrumentsCandlesFactory
+from oandapyV20.contrib.generic import granularity_to_time
 from datetime import datetime
+from operator import itemgetter
 import matplotlib.pyplot as plt
 from oandapyV20.endpoints import orders, positions
+from . import candle_store
+from .fake_exchange import FakeExchange
+from .single_flight import SingleFlight
 
 # plt.rcParams['axes.facecolor'] =  'black'
 # plt.rcParams['figure.facecolor'] = 'black'
@@ -77,6 +83,9 @@ def post_img(image_path, body):
 import os
 
 def connect(live_mode):
+    if os.getenv("EXCHANGE_BACKEND", "oanda") == 'fake':
+        # Offline stand-in: no network access or API keys needed
+        return FakeExchange.from_env(), f"fake-{live_mode}"
     if live_mode == 'test':
         api_key = os.getenv("OANDA_TEST_API_KEY")
         accountID = os.getenv("OANDA_TEST_ACCOUNT_ID")
@@ -93,22 +102,167 @@ def connect(live_mode):
     return exchange, accountID
 
 def parse_prices(candles):
-	npdataset = np.zeros((7,len(candles)))
-	for i in range(len(candles)):
-		str_time = candles[i].get('time')[:19]
-		dow = datetime.strptime(str_time[:10], '%Y-%M-%d').weekday()
-		d_time = float(str_time[11:13]) + float(str_time[14:16])/100 +  float(str_time[17:19])/10000
-		npdataset[:,i] = np.array([candles[i].get('mid')['o'], candles[i].get('mid')['c'], candles[i].get('mid')['h'], candles[i].get('mid')['l'], candles[i].get('volume'), d_time, dow]).T
-	return npdataset
+	"""Parse OANDA candles into the 7-row array (Open, Close, High, Low, Volume, d_time, dow)."""
+	return _parse_candles(candles)[0]
 
-def get_price(instrument, frequency, last_n, exchange):
-    return parse_prices( exchange.request(get_prices(instrument, {"granularity": frequency, 'count': str(last_n)})).get('candles'))
+def _parse_candles(candles):
+	"""parse_prices plus the candle open times as datetime64[s]."""
+	npdataset = np.zeros((7,len(candles)))
+	if not candles:
+		return npdataset, np.zeros(0, dtype='datetime64[s]')
+	mid = itemgetter('o', 'c', 'h', 'l')
+	npdataset[:4] = np.array([mid(c['mid']) for c in candles], dtype=float).T
+	npdataset[4] = [c['volume'] for c in candles]
+
+	# Time of day as hh.mmss and weekday (Monday = 0; 1970-01-01 was a Thursday)
+	stamps = np.array([c['time'][:19] for c in candles], dtype='datetime64[s]')
+	days = stamps.astype('datetime64[D]')
+	secs = (stamps - days).astype(np.int64)
+	npdataset[5] = (secs // 3600).astype(float) + (secs // 60 % 60) / 100 + (secs % 60) / 10000
+	npdataset[6] = (days.astype(np.int64) + 3) % 7
+	return npdataset, stamps
+
+MAX_CANDLES_PER_REQUEST = 5000  # OANDA limit for 'count'
+
+# Identical concurrent read requests share one call to the exchange
+exchange_requests = SingleFlight(ttl=float(os.getenv("EXCHANGE_COALESCE_TTL", 0)))
+
+def _params_key(params):
+    return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+def _fetch_candles(exchange, instrument, params):
+    key = ('candles', id(exchange), instrument, _params_key(params))
+    return exchange_requests.do(key, lambda: exchange.request(get_prices(instrument, params)).get('candles'))
+
+def _account_summary(exchange, ID):
+    return exchange_requests.do(('summary', id(exchange), ID), lambda: exchange.request(AccountSummary(ID)))
+
+def _store_complete(series, candles):
+    """Append the complete candles to the store series."""
+    complete = [c for c in candles if c.get('complete', True)]
+    prices, stamps = _parse_candles(complete)
+    series.append(prices, stamps)
+
+def _sync_store(series, instrument, frequency, exchange):
+    """
+    Fetch only candles newer than the last stored complete candle.
+
+    Returns:
+        list: The candles that are still forming (not stored).
+    """
+    while True:
+        last = series.last_time()
+        candles = _fetch_candles(exchange, instrument, {
+            "granularity": frequency,
+            "from": np.datetime_as_string(last, unit='s') + 'Z',
+            "count": str(MAX_CANDLES_PER_REQUEST)})
+        count_before = series.count
+        _store_complete(series, candles)
+        # A short page reached the present; a full one means we were far behind
+        if len(candles) < MAX_CANDLES_PER_REQUEST or series.count == count_before:
+            return [c for c in candles if not c.get('complete', True)]
+
+def get_price(instrument, frequency, last_n, exchange, with_times=False):
+    """
+    The last `last_n` candles (7-row parse_prices layout), the last one possibly
+    still forming. With with_times=True also returns their open times (datetime64[s]).
+    """
+    prices, times = _get_price(instrument, frequency, last_n, exchange)
+    return (prices, times) if with_times else prices
+
+def _get_price(instrument, frequency, last_n, exchange):
+    store = candle_store.default_store()
+    if store is None:
+        return _parse_candles(_fetch_candles(exchange, instrument, {"granularity": frequency, 'count': str(last_n)}))
+
+    series = store.series(instrument, frequency)
+    with series.lock:
+        if series.count:
+            forming = _sync_store(series, instrument, frequency, exchange)
+            n_stored = last_n - len(forming)
+            if n_stored <= series.count:
+                forming_prices, forming_times = _parse_candles(forming)
+                if n_stored <= 0:
+                    return forming_prices[:, -last_n:], forming_times[-last_n:]
+                return (np.hstack([series.tail(n_stored), forming_prices]),
+                        np.concatenate([series.times()[-n_stored:], forming_times]))
+
+        # Not enough history stored yet: fetch as usual and restart the series from it
+        candles = _fetch_candles(exchange, instrument, {"granularity": frequency, 'count': str(last_n)})
+        series.reset()
+        _store_complete(series, candles)
+        return _parse_candles(candles)
 
 def get_hist_prices(sym, gran, exchange, start=None, end=None, count=4000):
     """Get historical prices with optional date range"""
+    store = candle_store.default_store()
+    if store is not None and start:
+        prices = _get_hist_prices_stored(store.series(sym, gran), sym, gran, exchange, start, end, count)
+        if prices is not None:
+            return prices
+    return _download_hist_prices(sym, gran, exchange, start, end, count)
+
+class _RateLimiter:
+    """Spaces out call starts to at most `rate` per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+HIST_DOWNLOAD_WORKERS = int(os.getenv("HIST_DOWNLOAD_WORKERS", 4))
+hist_rate_limiter = _RateLimiter(float(os.getenv("HIST_DOWNLOAD_RATE", 10)))  # requests per second
+
+def _download_candles(sym, gran, exchange, params):
+    """
+    Download a date range as (prices, times, complete) arrays.
+
+    The range is split into count-sized chunks (InstrumentsCandlesFactory), fetched
+    by a bounded thread pool under the shared rate limit and parsed in the workers.
+    Chunks are stitched in time order, dropping candles repeated at chunk edges,
+    into one preallocated array.
+    """
+    def fetch(r):
+        hist_rate_limiter.wait()
+        candles = _fetch_candles(exchange, sym, r.params)
+        prices, times = _parse_candles(candles)
+        return prices, times, np.array([c.get('complete', True) for c in candles], dtype=bool)
+
     print('Loading historical....')
-    candles = []
-    
+    chunk_requests = list(InstrumentsCandlesFactory(instrument=sym, params=params))
+    with ThreadPoolExecutor(max_workers=max(1, min(HIST_DOWNLOAD_WORKERS, len(chunk_requests)))) as pool:
+        chunks = list(pool.map(fetch, chunk_requests))
+
+    keep = []
+    last = None
+    for _, times, _ in chunks:
+        mask = times > last if last is not None else np.ones(len(times), dtype=bool)
+        keep.append(mask)
+        if mask.any():
+            last = times[mask][-1]
+
+    total = sum(int(mask.sum()) for mask in keep)
+    prices = np.empty((7, total))
+    times = np.empty(total, dtype='datetime64[s]')
+    complete = np.empty(total, dtype=bool)
+    pos = 0
+    for (chunk_prices, chunk_times, chunk_complete), mask in zip(chunks, keep):
+        n = int(mask.sum())
+        prices[:, pos:pos + n] = chunk_prices[:, mask]
+        times[pos:pos + n] = chunk_times[mask]
+        complete[pos:pos + n] = chunk_complete[mask]
+        pos += n
+    return prices, times, complete
+
+def _hist_params(gran, count, start=None, end=None):
     params = {
         "granularity": gran,
         "count": count
@@ -119,17 +273,61 @@ def get_hist_prices(sym, gran, exchange, start=None, end=None, count=4000):
     if end:
         params["to"] = end
         
-    for r in InstrumentsCandlesFactory(instrument=sym, params=params):
-        candles.extend(exchange.request(r).get('candles'))
-    return parse_prices(candles)
+    return params
+
+def _download_hist_prices(sym, gran, exchange, start=None, end=None, count=4000):
+    return _download_candles(sym, gran, exchange, _hist_params(gran, count, start, end))[0]
+
+def _get_hist_prices_stored(series, sym, gran, exchange, start, end, count):
+    """
+    Serve the range [start, end) from the candle store, downloading only what it lacks.
+
+    An empty store downloads just the requested range and later syncs bring it up
+    to date. History before the first stored candle is fetched as [start, first
+    stored candle) and put in front of it. Downloads run outside the series lock
+    so get_price polls on the same series are not held up.
+
+    Returns None when the range ends before the stored history begins, in which
+    case the caller downloads it directly.
+    """
+    start_t = np.datetime64(start[:19], 's')
+    end_t = np.datetime64(end[:19], 's') if end else None
+    with series.lock:
+        first = series.first_time()
+    if first is None:
+        prices, times, complete = _download_candles(sym, gran, exchange, _hist_params(gran, count, start, end))
+        with series.lock:
+            if series.count == 0:
+                series.append(prices[:, complete], times[complete])
+        return prices
+    if end_t is not None and end_t <= first:
+        return None
+    if start_t < first:
+        prices, times, complete = _download_candles(
+            sym, gran, exchange, _hist_params(gran, count, start, np.datetime_as_string(first, unit='s') + 'Z'))
+        with series.lock:
+            if series.first_time() == first:
+                series.prepend(prices[:, complete], times[complete])
+
+    with series.lock:
+        forming_prices, forming_times = _parse_candles(_sync_store(series, sym, gran, exchange))
+        times = series.times()
+        lo = np.searchsorted(times, start_t, side='left')
+        hi = np.searchsorted(times, end_t, side='left') if end_t is not None else len(times)
+        prices = series.read(lo, hi)
+        if len(forming_times) and hi == len(times):
+            if end_t is not None:
+                forming_prices = forming_prices[:, forming_times < end_t]
+            prices = np.hstack([prices, forming_prices])
+        return prices
 
 def get_units(exchange, ID,  scale=1):
-	response = exchange.request(AccountSummary(ID))
+	response = _account_summary(exchange, ID)
 	available_balance = float(response['account']['balance'])
 	return int(available_balance * scale)
 
 def get_balance(exchange, ID):
-	response = exchange.request(AccountSummary(ID))
+	response = _account_summary(exchange, ID)
 	available_balance = float(response['account']['balance'])
 	pl = float(response['account']['unrealizedPL'])
 	margin = float(response['account']['balance'])
@@ -332,32 +530,35 @@ def find_all_pairs(exchange, ID, type, pricelimit):
 
 
 
-def pause(gran):
-    time_now  = datetime.now()
-    seconds = time_now.second
-    minutes = time_now.minute *60 + seconds
-    hours  = time_now.hour * 60  * 60 + minutes + seconds
-    offset = 1 
-    if gran == 'S5':
-        sec = (seconds) % 5
-    if gran == 'S10':
-        sec = (seconds) % 10
-
-    if gran == 'M1':
-        sec = (60 - seconds) % 60
-    
-    if gran == 'M5':
-        sec = (5 * 60 - minutes) % (5 * 60)
+# OANDA granularities with a fixed length ('M' is monthly, which granularity_to_time reads as one minute)
+FIXED_GRANULARITIES = ('S5', 'S10', 'S15', 'S30', 'M1', 'M2', 'M4', 'M5', 'M10', 'M15', 'M30',
+                       'H1', 'H2', 'H3', 'H4', 'H6', 'H8', 'H12', 'D', 'W')
 
-    if gran == 'M15':
-        sec = (15 * 60 -  minutes) % (15 * 60)
-    
-    if gran == 'H1':
-        sec = (60 * 60 -  minutes) % (60 * 60)
+def candle_seconds(gran):
+    """Length of a `gran` candle in seconds (e.g. 300 for 'M5'); ValueError without a fixed length."""
+    if gran not in FIXED_GRANULARITIES:
+        raise ValueError(f"Granularity {gran!r} has no fixed candle length")
+    return granularity_to_time(gran)
+
+def seconds_to_next_candle(gran, now=None):
+    """
+    Seconds from `now` (local time, default now) until the current `gran` candle closes.
 
-    if gran == 'H4':
-        sec = (4 * 60 * 60 -  hours) % (4 * 60 * 60)
-        offset =  60 
+    Candles are aligned to local midnight, which holds for the intraday
+    granularities whose length divides 24 hours in whole-hour time zones. Daily
+    and weekly candles open at the exchange's alignment time instead and raise
+    ValueError. Used by pause(); code holding candle times should use them instead.
+    """
+    period = candle_seconds(gran)
+    if period >= 24 * 60 * 60:
+        raise ValueError(f"Granularity {gran!r} is not aligned to local midnight; use the candle times")
+    time_now = now or datetime.now()
+    elapsed = time_now.hour * 60 * 60 + time_now.minute * 60 + time_now.second + time_now.microsecond / 1e6
+    return (period - elapsed) % period
+
+def pause(gran):
+    offset = 60 if gran == 'H4' else 1
+    sec = int(seconds_to_next_candle(gran))
 
     #print('pausing for ' + str(sec))
     time.sleep(sec + offset)
@@ -1,4 +1,7 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from functools import partial
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
@@ -17,8 +20,14 @@ from services.trading_service import TradingService
 from services.news_service import NewsService
 from services.backtest_service import BacktestService
 from services.market_status_service import MarketStatusService
+from services.indicator_pipeline import pipelines
+from services.blocking import blocking, run_blocking
+from services.response_cache import response_cache
+from services.market_stream import market_streams
+from services.encoding import UnsupportedFormat, encoded_response, negotiate_format
 # from services.probability_service import ProbabilityService
-from libs.tradelib import connect, get_price
+from libs.tradelib import connect, exchange_requests
+from libs.candle_buffer import candle_buffers
 
 # Initialize FastAPI app
 app = FastAPI(title=Config.API_TITLE, version=Config.API_VERSION)
@@ -60,6 +69,13 @@ async def global_exception_handler(request, exc):
         content={"detail": f"Internal server error: {str(exc)}"}
     )
 
+def response_format(request: Request, format: Optional[str]) -> str:
+    """Negotiated payload format; 406 for an unknown or unavailable ?format="""
+    try:
+        return negotiate_format(format, request.headers.get("accept"))
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
 # Routes
 @app.get("/")
 async def root():
@@ -69,7 +85,7 @@ async def root():
 async def get_status():
     """Get account status and trading statistics"""
     try:
-        return trading_service.get_account_status()
+        return await run_blocking('oanda', trading_service.get_account_status)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -79,6 +95,8 @@ async def connect_account(mode: str):
     global exchange, account_id
     try:
         exchange, account_id = connect(mode)
+        candle_buffers.clear()
+        response_cache.clear()
         trading_service.exchange = exchange
         trading_service.account_id = account_id
         trading_service.set_account_mode(mode)
@@ -88,53 +106,108 @@ async def connect_account(mode: str):
 
 @app.get("/api/market-data")
 async def get_market_data(
+    request: Request,
     pair: str = Config.DEFAULT_PAIR,
     timeframe: str = Config.DEFAULT_TIMEFRAME,
     periods: int = Config.DEFAULT_PERIODS,
     window_lengths: str = "3,12,24,36,48",
     strategy: str = "classic",
     zl_length: int = 70,
-    probability_tp: float = 5
+    probability_tp: float = 5,
+    closed_only: bool = False,
+    format: Optional[str] = None
 ):
     """Get market data with technical indicators"""
+    fmt = response_format(request, format)
     try:
         windows = [int(x) for x in window_lengths.split(",")]
-        return data_service.get_market_data(pair, timeframe, periods, windows, strategy, zl_length, probability_tp)
+        return encoded_response(await run_blocking('oanda', data_service.get_market_data,
+                                            pair, timeframe, periods, windows, strategy, zl_length, probability_tp,
+                                            closed_only), fmt)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.websocket("/ws/market-data")
+async def stream_market_data(
+    websocket: WebSocket,
+    pair: str = Config.DEFAULT_PAIR,
+    timeframe: str = Config.DEFAULT_TIMEFRAME,
+    periods: int = Config.DEFAULT_PERIODS,
+    window_lengths: str = "3,12,24,36,48",
+    strategy: str = "classic",
+    zl_length: int = 70,
+    probability_tp: float = 5
+):
+    """Stream market data: a snapshot, then column deltas (see services/market_stream.py)"""
+    await websocket.accept()
+    windows = [int(x) for x in window_lengths.split(",")]
+    key = (pair, timeframe, periods, tuple(windows), strategy, zl_length, probability_tp)
+    compute = partial(data_service.get_market_data_with_times,
+                      pair, timeframe, periods, windows, strategy, zl_length, probability_tp)
+
+    async def listen():
+        # Clients only listen; reading is how a disconnect is noticed
+        async for _ in websocket.iter_text():
+            pass
+
+    listener = asyncio.create_task(listen())
+    try:
+        async with market_streams.subscribe(key, compute) as queue:
+            while True:
+                message = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({message, listener}, return_when=asyncio.FIRST_COMPLETED)
+                if listener in done:
+                    message.cancel()
+                    break
+                await websocket.send_json(message.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        listener.cancel()
+
 @app.get("/api/key-levels")
 async def get_key_levels(
+    request: Request,
     pair: str = Config.DEFAULT_PAIR,
     timeframe: str = Config.DEFAULT_TIMEFRAME,
     periods: int = Config.DEFAULT_PERIODS,
     window: int = 20,
-    threshold: float = 0.001
+    threshold: float = 0.001,
+    closed_only: bool = False,
+    format: Optional[str] = None
 ):
     """Get key support and resistance levels"""
+    fmt = response_format(request, format)
     try:
-        return data_service.get_key_levels(pair, timeframe, periods, window, threshold)
+        return encoded_response(await run_blocking('oanda', data_service.get_key_levels,
+                                            pair, timeframe, periods, window, threshold, closed_only), fmt)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/polynomial-predictions")
 async def get_polynomial_predictions(
+    request: Request,
     pair: str = Config.DEFAULT_PAIR,
     timeframe: str = Config.DEFAULT_TIMEFRAME,
     periods: int = Config.DEFAULT_PERIODS,
     lookback: int = 20,
     forecast_periods: int = 5,
-    degree: int = 2
+    degree: int = 2,
+    format: Optional[str] = None
 ):
     """Get polynomial predictions for future price movements"""
+    fmt = response_format(request, format)
     try:
-        # Get market data first to reuse median values
-        market_data = data_service.get_market_data(pair, timeframe, periods, [3,12,24,36,48])
-        median_values = np.array(market_data.get('medians', []))
-        
-        return data_service.get_polynomial_predictions(
-            pair, timeframe, periods, lookback, forecast_periods, degree, median_values
-        )
+        def predict():
+            # Get market data first to reuse median values
+            market_data = data_service.get_market_data(pair, timeframe, periods, [3,12,24,36,48])
+            median_values = np.array(market_data.get('medians', []))
+
+            return data_service.get_polynomial_predictions(
+                pair, timeframe, periods, lookback, forecast_periods, degree, median_values
+            )
+
+        return encoded_response(await run_blocking('oanda', predict), fmt)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -146,11 +219,11 @@ async def get_current_price(
 ):
     """Get current market price for a currency pair"""
     try:
-        current_price = get_price(pair, timeframe, 1, exchange)[1, -1]  # Get latest close price
+        # Get same data as market data (shared candle buffer, one refresh per interval)
+        data = await run_blocking('oanda', candle_buffers.get_price, pair, timeframe, periods + 50, exchange)
+        current_price = data[1, -1]  # Get latest close price
         
         # Get the mean price used for scaling (same as in market data)
-        # Use the same parameters as the chart data
-        data = get_price(pair, timeframe, periods + 50, exchange)  # Get same data as market data
         display_data = data[:, -periods:]  # Same as market data
         mean_price = np.mean(display_data[:4])  # Mean of OHLC data (same as market data)
         
@@ -165,7 +238,7 @@ async def get_current_price(
 async def place_trade(trade: TradeRequest):
     """Place a new trade"""
     try:
-        return trading_service.place_trade(trade.pair, trade.size, trade.direction)
+        return await run_blocking('trading', trading_service.place_trade, trade.pair, trade.size, trade.direction)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -174,7 +247,7 @@ async def get_trades():
     """Get all open trades with current P&L"""
     try:
         return {
-            "open_trades": trading_service.get_trades_with_pl(),
+            "open_trades": await run_blocking('trading', trading_service.get_trades_with_pl),
             "profit_history": trading_service.profit_history
         }
     except Exception as e:
@@ -184,7 +257,7 @@ async def get_trades():
 async def close_trade_endpoint(trade_id: str):
     """Close a specific trade"""
     try:
-        return trading_service.close_trade(trade_id)
+        return await run_blocking('trading', trading_service.close_trade, trade_id)
     except Exception as e:
         if "Trade not found" in str(e):
             raise HTTPException(status_code=404, detail=str(e))
@@ -194,7 +267,7 @@ async def close_trade_endpoint(trade_id: str):
 async def close_all_trades():
     """Close all open trades"""
     try:
-        return trading_service.close_all_trades()
+        return await run_blocking('trading', trading_service.close_all_trades)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -222,7 +295,8 @@ async def update_trade_sl(trade_id: str, stop_loss: float):
 async def run_backtest(params: BacktestParams):
     """Run a backtest with specified parameters"""
     try:
-        return backtest_service.run_backtest(
+        return await run_blocking(
+            'compute', backtest_service.run_backtest,
             params.pair,
             params.timeframe,
             params.days_back,
@@ -239,7 +313,7 @@ async def run_backtest(params: BacktestParams):
 async def get_news_feed(currency_pair: str = Config.DEFAULT_PAIR, enable_ai_analysis: bool = True):
     """Get news feed with optional AI sentiment analysis"""
     try:
-        return news_service.get_news_feed(currency_pair, enable_ai_analysis)
+        return await run_blocking('news', news_service.get_news_feed, currency_pair, enable_ai_analysis)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch news: {str(e)}")
 
@@ -247,7 +321,7 @@ async def get_news_feed(currency_pair: str = Config.DEFAULT_PAIR, enable_ai_anal
 async def get_market_status():
     """Get current market status from Polygon.io"""
     try:
-        return market_status_service.get_market_status()
+        return await run_blocking('polygon', market_status_service.get_market_status)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch market status: {str(e)}")
 
@@ -255,13 +329,26 @@ async def get_market_status():
 async def get_market_events():
     """Get upcoming market opens/closes"""
     try:
+        events = await run_blocking('polygon', market_status_service.get_upcoming_market_events)
+        status = await run_blocking('polygon', market_status_service.get_market_status)
         return {
-            "events": market_status_service.get_upcoming_market_events(),
-            "timestamp": market_status_service.get_market_status()["timestamp"]
+            "events": events,
+            "timestamp": status["timestamp"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch market events: {str(e)}")
 
+@app.get("/api/stats")
+async def get_stats():
+    """Request coalescing, cache, blocking call and stream statistics"""
+    return {
+        "exchange_requests": exchange_requests.stats(),
+        "indicator_pipelines": pipelines.stats(),
+        "response_cache": response_cache.stats(),
+        "blocking_calls": blocking.stats(),
+        "market_streams": market_streams.stats()
+    }
+
 # Probability endpoints temporarily disabled
 # @app.get("/api/signal-probabilities")
 # async def get_signal_probabilities(
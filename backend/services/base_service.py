@@ -36,6 +36,11 @@ class BaseService(ABC):
         })
         return response
     
+    @staticmethod
+    def create_array_response(data: Dict[str, Any], **metadata) -> Dict[str, Any]:
+        """Like create_response, but NumPy values are left for NumpyJSONResponse to encode"""
+        return {**data, "timestamp": datetime.now().isoformat(), **metadata}
+    
     def handle_service_error(self, error: Exception, operation: str) -> Dict[str, Any]:
         """Standardized error handling"""
         error_msg = f"Error in {operation}: {str(error)}"
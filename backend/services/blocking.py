@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+from config import Config
+
+
+class BlockingRunner:
+    """
+    Runs blocking service calls off the event loop with per-dependency limits.
+
+    Calls go to one shared thread pool. Each dependency (OANDA, news feeds,
+    Polygon, heavy compute, ...) may have at most its configured number of calls
+    running at once; further callers wait on the event loop without holding a
+    thread. A slow dependency therefore only queues its own callers. The pool
+    has one thread per allowed call, so no dependency can starve another.
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = dict(limits)
+        self._executor = ThreadPoolExecutor(max_workers=sum(self.limits.values()), thread_name_prefix="blocking")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats = {name: {"running": 0, "waiting": 0, "completed": 0, "failed": 0} for name in self.limits}
+
+    async def run(self, dependency: str, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) run in the pool under the dependency's limit."""
+        if dependency not in self.limits:
+            raise ValueError(f"Unknown dependency: {dependency}")
+        semaphore = self._semaphores.get(dependency)
+        if semaphore is None:
+            semaphore = self._semaphores[dependency] = asyncio.Semaphore(self.limits[dependency])
+        stats = self._stats[dependency]
+
+        stats["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["waiting"] -= 1
+        stats["running"] += 1
+
+        loop = asyncio.get_running_loop()
+
+        def finished(future):
+            # The slot is freed when the thread is done, even if the caller went away
+            loop.call_soon_threadsafe(self._release, dependency, semaphore, future)
+
+        future = self._executor.submit(partial(fn, *args, **kwargs))
+        future.add_done_callback(finished)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, dependency: str, semaphore: asyncio.Semaphore, future):
+        stats = self._stats[dependency]
+        stats["running"] -= 1
+        stats["failed" if future.cancelled() or future.exception() else "completed"] += 1
+        semaphore.release()
+
+    def stats(self) -> dict:
+        return {name: {"limit": self.limits[name], **counts} for name, counts in self._stats.items()}
+
+
+# Shared by all routes
+blocking = BlockingRunner(Config.BLOCKING_LIMITS)
+
+
+async def run_blocking(dependency: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call for `dependency` without stalling the event loop."""
+    return await blocking.run(dependency, fn, *args, **kwargs)
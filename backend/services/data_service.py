@@ -1,10 +1,14 @@
+import time
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
-from libs.tradelib import get_price, get_hist_prices
-from libs.indicators import calc_HA, zlema_ochl, calc_rsi, market_eff, key_levels_composite, zero_lag_trend_signals
+from typing import Callable, List, Dict, Any, Tuple
+from libs.candle_buffer import candle_buffers
+from libs.indicators import key_levels_composite
+from libs.tradelib import candle_seconds
 from config import Config
 from .base_service import BaseService
+from .indicator_pipeline import IndicatorPipeline, pipelines
+from .response_cache import response_cache, candle_version
 
 class DataService(BaseService):
     def __init__(self, exchange):
@@ -13,38 +17,73 @@ class DataService(BaseService):
     def get_service_name(self) -> str:
         return "DataService"
     
-    def get_market_data(self, pair: str, timeframe: str, periods: int, window_lengths: List[int], strategy: str = "classic", zl_length: int = 12, probability_tp: float = 5) -> Dict[str, Any]:
-        """Get comprehensive market data with indicators"""
+    def _cached(self, key: tuple, pair: str, timeframe: str, n_candles: int, closed_only: bool,
+                build: Callable[[np.ndarray], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Serve build(candles) through the response cache.
+
+        Live views include the forming candle and are keyed on the candles
+        themselves, so any tick recomputes. Closed-candle views leave the forming
+        candle out and are keyed on the request alone, expiring when the forming
+        candle closes.
+        """
+        if not closed_only:
+            data = candle_buffers.get_price(pair, timeframe, n_candles, self.exchange)
+            return response_cache.get_or_compute(key + ('live', candle_version(data)), lambda: build(data))
+
+        key = key + ('closed',)
+        response = response_cache.get(key)
+        if response is None:
+            data, times = candle_buffers.get_price(pair, timeframe, n_candles + 1, self.exchange, with_times=True)
+            now = time.time()
+            closes = times.astype(np.int64) + candle_seconds(timeframe)
+            closed = closes <= now
+            response = build(data[:, closed][:, -n_candles:])
+            # Cache only while the buffer holds the forming candle, until it closes. Its close
+            # comes from the exchange's candle times, not local wall time (H4 and D candles are
+            # aligned to New York 17:00, not local midnight)
+            if len(closes) and not closed[-1]:
+                response_cache.put(key, response, ttl=float(closes[-1] - now))
+        return response
+
+    def get_market_data(self, pair: str, timeframe: str, periods: int, window_lengths: List[int], strategy: str = "classic", zl_length: int = 12, probability_tp: float = 5, closed_only: bool = False) -> Dict[str, Any]:
+        """Get comprehensive market data with indicators (completed candles only with closed_only)"""
         # Get price data and scale to pips
         n_candles = periods + 50
-        data = get_price(pair, timeframe, n_candles, self.exchange)
+        key = ('market-data', pair, timeframe, periods, tuple(window_lengths), strategy, zl_length, probability_tp)
+        return self._cached(key, pair, timeframe, n_candles, closed_only, lambda data: self._market_data(
+            data, pair, timeframe, periods, window_lengths, strategy, zl_length, probability_tp))
+
+    def get_market_data_with_times(self, pair: str, timeframe: str, periods: int, window_lengths: List[int], strategy: str = "classic", zl_length: int = 12, probability_tp: float = 5) -> Tuple[Dict[str, Any], np.ndarray]:
+        """Live market data plus the open times of its candles, from a single buffer read"""
+        n_candles = periods + 50
+        data, times = candle_buffers.get_price(pair, timeframe, n_candles, self.exchange, with_times=True)
+        key = ('market-data', pair, timeframe, periods, tuple(window_lengths), strategy, zl_length, probability_tp)
+        response = response_cache.get_or_compute(key + ('live', candle_version(data)), lambda: self._market_data(
+            data, pair, timeframe, periods, window_lengths, strategy, zl_length, probability_tp))
+        return response, np.array(times[-periods:])
+
+    def _market_data(self, data: np.ndarray, pair: str, timeframe: str, periods: int, window_lengths: List[int],
+                     strategy: str, zl_length: int, probability_tp: float) -> Dict[str, Any]:
         display_data = data[:, -periods:]
         
         # Keep raw price data (no scaling)
         
-        # Calculate indicators
-        ha = calc_HA(display_data)
-        #ha_zlema_list = [zlema_ochl(ha[:4], window) for window in window_lengths]
-        zlema_list = [zlema_ochl(display_data[:4], window) for window in window_lengths]
-        
-        # Calculate RSI and efficiency for all candle data
-        all_candles = [ha] + zlema_list
-        rsi_data = [calc_rsi(candle_data[:4], Config.RSI_WINDOW).tolist() for candle_data in all_candles]
-        eff_data = [market_eff(candle_data[:4], Config.EFFICIENCY_WINDOW).tolist() for candle_data in all_candles]
-        
-        # Calculate statistics
-        zlema_ohlc_data = np.concatenate([candle[:4] for candle in all_candles[1:]], axis=0)
-        median_values = np.median(zlema_ohlc_data, axis=0)
+        # Calculate indicators (shared with other endpoints polling the same candles)
+        pipeline = pipelines.get(pair, timeframe, display_data, window_lengths)
+        all_candles = pipeline.all_candles
+        median_values = pipeline.median
         
+        # Arrays stay NumPy; the route encodes them in one pass (services/encoding.py)
         data = {
-            "all_candles": [candle.tolist() for candle in all_candles],
-            "eff_data": eff_data,
-            "std_devs": (np.std(zlema_ohlc_data, axis=0) * Config.PIP_MULTIPLIER).tolist(),
-            "medians": median_values.tolist(),
-            "rsi_data": rsi_data
+            "all_candles": list(all_candles),
+            "eff_data": pipeline.efficiency,
+            "std_devs": pipeline.std * Config.PIP_MULTIPLIER,
+            "medians": median_values,
+            "rsi_data": pipeline.rsi
         }
         
-        response = self.create_response(data, pair=pair, timeframe=timeframe, periods=periods)
+        response = self.create_array_response(data, pair=pair, timeframe=timeframe, periods=periods)
 
         # Add signal probabilities for all strategies using existing chart data (cached)
         cache_key = f"{pair}_{timeframe}_{periods}_{strategy}_{probability_tp}"
@@ -58,7 +97,7 @@ class DataService(BaseService):
                 from .probability_service import ProbabilityService
                 prob_service = ProbabilityService(self.exchange)
                 prob_data = prob_service.calculate_signal_probabilities_from_chart_data(
-                    all_candles, median_values, None, probability_tp
+                    all_candles, median_values, None, probability_tp, pipeline=pipeline
                 )
                 if not prob_data.get('error'):
                     self._prob_cache[cache_key] = prob_data
@@ -69,20 +108,8 @@ class DataService(BaseService):
 
         # Optional Zero-Lag strategy overlay
         if strategy and strategy.lower() == "zero_lag":
-            ochl = display_data[[0,1,2,3], :]  # [Open, Close, High, Low]
-            zl = zero_lag_trend_signals(ochl, length=zl_length, mult=1.2)
-            # Convert numpy to lists for JSON, handle special values
-            response["zl"] = {}
-            for k, v in zl.items():
-                if isinstance(v, np.ndarray):
-                    if v.dtype == bool:
-                        response["zl"][k] = v.astype(int).tolist()  # Convert bool to int
-                    else:
-                        # Replace NaN/inf with None for JSON compatibility
-                        v_clean = np.where(np.isfinite(v), v, None)
-                        response["zl"][k] = v_clean.tolist()
-                else:
-                    response["zl"][k] = v
+            # NaN/inf are written as null and bool arrays as 0/1 when encoded
+            response["zl"] = dict(pipeline.zero_lag(zl_length, mult=1.2))
             
 
 
@@ -96,31 +123,18 @@ class DataService(BaseService):
         if median_values is None:
             # Fallback: calculate median values if not provided
             n_candles = periods + 50
-            data = get_price(pair, timeframe, n_candles, self.exchange)
+            data = candle_buffers.get_price(pair, timeframe, n_candles, self.exchange)
             display_data = data[:, -periods:]
             
-            # Scale data to pips
-            display_data[:4] = (display_data[:4] - np.mean(display_data[:4])) * Config.PIP_MULTIPLIER
-            
             # Calculate indicators (same as market data)
-            ha = calc_HA(display_data)
-            #ha_zlema_list = [zlema_ochl(ha[:4], window) for window in [3,12,24,36,48]]
-            zlema_list = [zlema_ochl(display_data[:4], window) for window in [3,12,24,36,48]]
-            
-            # Combine all candles (raw + HA ZLEMA + ZLEMA)
-            all_candles = [ha] + zlema_list
-            
-            # Calculate median across all candles for each time point
-            # Extract OHLC data from each candle and stack them
-            ohlc_data = []
-            for candle in all_candles:
-                ohlc_data.append(candle[:4])  # Take OHLC (first 4 rows)
+            pipeline = pipelines.get(pair, timeframe, display_data, [3,12,24,36,48])
             
-            # Stack all OHLC data and calculate median across all candles
-            ohlc_array = np.array(ohlc_data)
-            # Calculate median across all candles for each time point, then take median of OHLC
-            median_values = np.median(ohlc_array, axis=0)  # Shape: (4, periods)
+            # Calculate median across all candles (HA + ZLEMA) for each time point, then take median of OHLC
+            median_values = np.median(pipeline.candle_stack, axis=0)  # Shape: (4, periods)
             median_values = np.median(median_values, axis=0)  # Shape: (periods,) - median of OHLC
+            
+            # Scale to pips
+            median_values = (median_values - np.mean(display_data[:4])) * Config.PIP_MULTIPLIER
         
         # Take last lookback median values
         recent_medians = median_values[-lookback:]
@@ -159,11 +173,16 @@ class DataService(BaseService):
             "timestamp": datetime.now().isoformat()
         }
     
-    def get_key_levels(self, pair: str, timeframe: str, periods: int, window: int, threshold: float) -> Dict[str, Any]:
-        """Get key levels for trading analysis"""
+    def get_key_levels(self, pair: str, timeframe: str, periods: int, window: int, threshold: float, closed_only: bool = False) -> Dict[str, Any]:
+        """Get key levels for trading analysis (completed candles only with closed_only)"""
         # Use more data for better level detection
         n_candles = max(periods + 100, 200)  # Ensure we have enough data
-        data = get_price(pair, timeframe, n_candles, self.exchange)
+        key = ('key-levels', pair, timeframe, periods, window, threshold)
+        return self._cached(key, pair, timeframe, n_candles, closed_only, lambda data: self._key_levels(
+            data, pair, timeframe, periods, n_candles, window, threshold))
+
+    def _key_levels(self, data: np.ndarray, pair: str, timeframe: str, periods: int, n_candles: int,
+                    window: int, threshold: float) -> Dict[str, Any]:
         display_data = data[:, -periods:] if periods < n_candles else data
         
         # Extract prices (no scaling)
@@ -174,17 +193,15 @@ class DataService(BaseService):
         key_levels = key_levels_composite(prices, volume, max(5, min(window, periods//10)), threshold)
         
         data = {"key_levels": key_levels}
-        return self.create_response(data, pair=pair, timeframe=timeframe, periods=periods, window=window, threshold=threshold)
+        return self.create_array_response(data, pair=pair, timeframe=timeframe, periods=periods, window=window, threshold=threshold)
     
 
     
     def calculate_indicators_for_backtest(self, data: np.ndarray, window_lengths: List[int]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
         """Calculate indicators for backtesting"""
-        data_copy = data.copy()
-        # Keep raw price data (no scaling)
-        ha = calc_HA(data_copy)
-        ha_zlema_list = [zlema_ochl(ha, window) for window in window_lengths]
-        zlema_list = [zlema_ochl(data_copy, window) for window in window_lengths]
-        return ha_zlema_list, zlema_list
+        # Keep raw price data (no scaling). A private pipeline: backtest ranges are
+        # computed once and must not evict the dashboard's cached pipelines.
+        pipeline = IndicatorPipeline(data, window_lengths)
+        return pipeline.ha_zlema, pipeline.zlema
     
     # Removed duplicate _convert_numpy method - now using BaseService.convert_numpy_to_json
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Compact columnar encodings for heavy API responses.
+
+JSON stays the default. Clients can ask for another format with `?format=` or
+the Accept header:
+
+    json      application/json                       plain JSON (default)
+    columnar  application/vnd.zlema.columnar+json    JSON, numeric lists as base64 typed arrays
+    msgpack   application/msgpack                    MessagePack, numeric lists as raw buffers
+
+In both compact formats every rectangular numeric list (for example
+all_candles, rsi_data or a zl series) of at least MIN_PACKED_VALUES values is
+replaced by
+
+    {"$array": "float32" | "int32", "shape": [...], "data": <little-endian buffer>}
+
+The buffer is base64 text in columnar JSON and binary in msgpack. Missing
+values (None, NaN, inf) become NaN in float32 arrays. Everything else keeps
+its JSON form. msgpack is optional: `pip install msgpack`.
+
+Plain JSON goes through NumpyJSONResponse. It encodes NumPy arrays and scalars
+left in the response directly, writing NaN/inf as null and bool arrays as 0/1.
+"""
+import base64
+import json
+import math
+from typing import Any, Optional
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+COLUMNAR_JSON = "application/vnd.zlema.columnar+json"
+MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": COLUMNAR_JSON,
+    "msgpack": "application/msgpack",
+}
+_ACCEPTED = {**{media: name for name, media in MEDIA_TYPES.items()}, "application/x-msgpack": "msgpack"}
+MIN_PACKED_VALUES = 16  # Shorter lists are cheaper as plain values
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def available_formats() -> list:
+    return [name for name in MEDIA_TYPES if name != "msgpack" or msgpack is not None]
+
+
+def negotiate_format(format: Optional[str] = None, accept: Optional[str] = None) -> str:
+    """
+    Pick the response format from an explicit ?format= or the Accept header.
+
+    Args:
+        format (str): Explicit format name; wins over Accept.
+        accept (str): Accept header; the highest-q supported media type is used.
+
+    Returns:
+        str: "json", "columnar" or "msgpack" ("json" when nothing else matches).
+    """
+    if format:
+        format = format.lower()
+        if format not in available_formats():
+            raise UnsupportedFormat(f"Unsupported format '{format}', expected one of {available_formats()}")
+        return format
+    best, best_q = "json", 0.0
+    for part in (accept or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        name = _ACCEPTED.get(media.lower())
+        if name is None or name not in available_formats():
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _array_to_list(array: np.ndarray) -> list:
+    if array.dtype.kind == "b":
+        return array.astype(np.int8).tolist()
+    if array.dtype.kind in "fc":
+        finite = np.isfinite(array)
+        if not finite.all():
+            values = array.astype(object)
+            values[~finite] = None
+            return values.tolist()
+    return array.tolist()
+
+
+def to_jsonable(obj: Any) -> Any:
+    """
+    JSON-ready copy of a response that may hold NumPy arrays and scalars.
+
+    Only dicts and lists are walked; arrays are converted in one tolist() call.
+    Non-finite floats become None and bool arrays become 0/1.
+    """
+    if isinstance(obj, np.ndarray):
+        return _array_to_list(obj)
+    if isinstance(obj, dict):
+        return {k: to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(item) for item in obj]
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, np.generic):
+        return to_jsonable(obj.item())
+    return obj
+
+
+class NumpyJSONResponse(JSONResponse):
+    """
+    JSONResponse for responses holding NumPy arrays.
+
+    Return it from a route to skip FastAPI's jsonable_encoder pass. Output
+    matches JSONResponse applied to the equivalent lists, with NaN/inf as null.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(to_jsonable(content), ensure_ascii=False, allow_nan=False,
+                          indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _packed(values: list) -> Optional[np.ndarray]:
+    """values as a float32/int32 array, or None if not a rectangular numeric list."""
+    try:
+        array = np.asarray(values)
+        if array.dtype == object:
+            array = np.array(values, dtype=np.float64)  # None -> NaN
+    except (ValueError, TypeError):
+        return None
+    if array.size < MIN_PACKED_VALUES:
+        return None
+    if array.dtype.kind in "biu":
+        # Large integers (e.g. epoch milliseconds) would lose precision in int32/float32
+        return array.astype("<i4") if np.abs(array).max(initial=0) < 2 ** 31 else None
+    if array.dtype.kind == "f":
+        return array.astype("<f4")
+    return None
+
+
+def pack_columns(obj: Any, binary: bool = False) -> Any:
+    """
+    Replace numeric lists in a JSON-ready response by typed array envelopes.
+
+    Args:
+        obj: Response built of dicts, lists, NumPy arrays and scalars.
+        binary (bool): Keep buffers as bytes (msgpack) instead of base64 text.
+    """
+    if isinstance(obj, dict):
+        return {k: pack_columns(v, binary) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        array = _packed(obj)
+        if array is None:
+            return [pack_columns(item, binary) for item in obj]
+        data = array.tobytes()
+        return {"$array": "int32" if array.dtype.kind == "i" else "float32", "shape": list(array.shape),
+                "data": data if binary else base64.b64encode(data).decode("ascii")}
+    return to_jsonable(obj)
+
+
+def encoded_response(content: Any, format: str) -> Response:
+    """
+    Response for content in the negotiated format.
+
+    Every format varies on Accept, JSON included, so shared caches keep the
+    representations apart.
+    """
+    headers = {"Vary": "Accept"}
+    if format == "json":
+        return NumpyJSONResponse(content, headers=headers)
+    if format == "columnar":
+        body = json.dumps(pack_columns(content), separators=(",", ":")).encode()
+    elif format == "msgpack":
+        body = msgpack.packb(pack_columns(content, binary=True), use_bin_type=True)
+    else:
+        raise UnsupportedFormat(f"Unsupported format '{format}'")
+    return Response(content=body, media_type=MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from libs.indicators import calc_HA, zlema_ochl_multi, zero_lag_trend_signals
+from libs.rolling import rolling_rsi, rolling_efficiency
+from config import Config
+
+
+class IndicatorPipeline:
+    """
+    Indicator graph for one candle set, each node computed at most once.
+
+    Nodes: raw candles -> HA -> ZLEMA[w] (of raw and of HA candles) -> stacked
+    candle sets -> RSI / efficiency, and ZLEMA OHLC rows -> std / median. Nodes
+    are computed lazily on first access and shared by every service reading the
+    same pipeline, so treat the returned arrays as read-only.
+    """
+
+    def __init__(self, candles: np.ndarray, window_lengths: List[int]):
+        self.candles = np.array(candles, dtype=float)
+        self.window_lengths = list(window_lengths)
+        self._zero_lag: Dict[Tuple[int, float], dict] = {}
+
+    @cached_property
+    def ha(self) -> np.ndarray:
+        """Heikin-Ashi candles."""
+        return calc_HA(self.candles)
+
+    @cached_property
+    def zlema(self) -> List[np.ndarray]:
+        """ZLEMA OCHL of the raw candles, one (4, N) array per window."""
+        return list(zlema_ochl_multi(self.candles[:4], self.window_lengths))
+
+    @cached_property
+    def ha_zlema(self) -> List[np.ndarray]:
+        """ZLEMA OCHL of the HA candles, one (4, N) array per window."""
+        return list(zlema_ochl_multi(self.ha[:4], self.window_lengths))
+
+    @cached_property
+    def all_candles(self) -> List[np.ndarray]:
+        """Candle sets shown on the chart: HA followed by each ZLEMA."""
+        return [self.ha] + self.zlema
+
+    @cached_property
+    def candle_stack(self) -> np.ndarray:
+        """OCHL rows of all_candles stacked into shape (P, 4, N)."""
+        return np.stack([candle_data[:4] for candle_data in self.all_candles])
+
+    @cached_property
+    def rsi(self) -> np.ndarray:
+        """RSI of every candle set, shape (P, N)."""
+        return rolling_rsi(self.candle_stack, Config.RSI_WINDOW)
+
+    @cached_property
+    def efficiency(self) -> np.ndarray:
+        """Market efficiency of every candle set, shape (P, N)."""
+        return rolling_efficiency(self.candle_stack, Config.EFFICIENCY_WINDOW)
+
+    @cached_property
+    def zlema_ohlc(self) -> np.ndarray:
+        """All ZLEMA OCHL rows, shape (4 * W, N)."""
+        return np.concatenate([candle[:4] for candle in self.zlema], axis=0)
+
+    @cached_property
+    def std(self) -> np.ndarray:
+        """Spread of the ZLEMA rows at each candle (price units)."""
+        return np.std(self.zlema_ohlc, axis=0)
+
+    @cached_property
+    def median(self) -> np.ndarray:
+        """Median of the ZLEMA rows at each candle."""
+        return np.median(self.zlema_ohlc, axis=0)
+
+    def zero_lag(self, length: int, mult: float = 1.2) -> dict:
+        """Zero-lag trend signals of the raw candles, memoized per (length, mult)."""
+        key = (length, mult)
+        if key not in self._zero_lag:
+            self._zero_lag[key] = zero_lag_trend_signals(self.candles[[0, 1, 2, 3], :], length=length, mult=mult)
+        return self._zero_lag[key]
+
+
+class PipelineRegistry:
+    """
+    LRU of indicator pipelines keyed by (pair, timeframe, windows, candle set).
+
+    A candle set is identified by its shape plus its first and last candles, so a
+    new candle, or a tick that moves the forming one, gives a fresh pipeline while
+    repeated requests for the same data share one.
+    """
+
+    def __init__(self, max_size: int = Config.PIPELINE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._pipelines: "OrderedDict[tuple, IndicatorPipeline]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(pair: Optional[str], timeframe: Optional[str], candles: np.ndarray, window_lengths: List[int]) -> tuple:
+        candles = np.asarray(candles, dtype=float)
+        return (pair, timeframe, tuple(window_lengths), candles.shape,
+                candles[:, 0].tobytes() if candles.size else b'',
+                candles[:, -1].tobytes() if candles.size else b'')
+
+    def get(self, pair: Optional[str], timeframe: Optional[str], candles: np.ndarray, window_lengths: List[int]) -> IndicatorPipeline:
+        """Return the pipeline for this candle set, creating it on a miss."""
+        key = self.make_key(pair, timeframe, candles, window_lengths)
+        with self._lock:
+            pipeline = self._pipelines.get(key)
+            if pipeline is not None:
+                self._pipelines.move_to_end(key)
+                self.hits += 1
+                return pipeline
+            self.misses += 1
+
+        pipeline = IndicatorPipeline(candles, window_lengths)
+        with self._lock:
+            pipeline = self._pipelines.setdefault(key, pipeline)
+            self._pipelines.move_to_end(key)
+            while len(self._pipelines) > self.max_size:
+                self._pipelines.popitem(last=False)
+        return pipeline
+
+    def clear(self):
+        with self._lock:
+            self._pipelines.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._pipelines), "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# Shared by all services
+pipelines = PipelineRegistry()
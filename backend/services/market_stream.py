@@ -0,0 +1,242 @@
+"""
+Shared market-data streams for the /ws/market-data WebSocket.
+
+Every subscription key (pair, timeframe, periods, windows, strategy, ...) has
+one MarketStream. It recomputes the market-data response once per interval
+for all of its subscribers and pushes messages to them:
+
+    {"type": "snapshot", "data": <full /api/market-data response>}
+
+first, and afterwards whenever the candles change
+
+    {"type": "delta", "shift": k, "start": s, "columns": {...}, "fields": {...}}
+
+To apply a delta, drop the first k columns of every per-candle series (the
+window slid forward by k candles). Then replace everything from column s on
+with the values in "columns". "columns" mirrors the snapshot's nesting and
+holds only the per-candle series. "fields" holds the other top-level values
+that changed, such as timestamp. A tick on the forming candle is a delta of one
+column, so traffic scales with what changed rather than with `periods`.
+Subscribers that fall behind are resynchronized with a fresh snapshot.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+from config import Config
+from .blocking import run_blocking
+from .encoding import to_jsonable
+
+
+def _is_series(value: Any, n: int) -> bool:
+    """True for (nested) lists whose innermost rows have one value per candle."""
+    while isinstance(value, list) and value and isinstance(value[0], list):
+        value = value[0]
+    return isinstance(value, list) and len(value) == n and n > 0
+
+
+def _rows(value: list):
+    if value and isinstance(value[0], list):
+        for row in value:
+            yield from _rows(row)
+    else:
+        yield value
+
+
+def _columns(value: list, start: int) -> list:
+    """Columns start: of a (nested) per-candle series."""
+    if value and isinstance(value[0], list):
+        return [_columns(row, start) for row in value]
+    return value[start:]
+
+
+def _split(response: dict, n: int) -> Tuple[dict, dict]:
+    """Separate per-candle series from the other fields, keeping the nesting of dicts."""
+    series, fields = {}, {}
+    for name, value in response.items():
+        if isinstance(value, dict):
+            sub_series, sub_fields = _split(value, n)
+            if sub_series:
+                series[name] = sub_series
+            if sub_fields:
+                fields[name] = sub_fields
+        elif _is_series(value, n):
+            series[name] = value
+        else:
+            fields[name] = value
+    return series, fields
+
+
+def _first_difference(old: list, new: list) -> Optional[int]:
+    """Index of the first differing value (NaN equals NaN), or None."""
+    for i, (a, b) in enumerate(zip(old, new)):
+        if a != b and not (a != a and b != b):
+            return i
+    return None
+
+
+def _first_change(before: dict, after: dict, shift: int, n: int) -> int:
+    """First column of `after` that differs from `before` slid by `shift` (n - shift if none)."""
+    start = n - shift
+    for name, value in after.items():
+        if isinstance(value, dict):
+            start = min(start, _first_change(before[name], value, shift, n))
+            continue
+        for old, new in zip(_rows(before[name]), _rows(value)):
+            changed = _first_difference(old[shift:], new[:n - shift])
+            if changed is not None:
+                start = min(start, changed)
+    return start
+
+
+def _slice_series(series: dict, start: int) -> dict:
+    return {name: _slice_series(value, start) if isinstance(value, dict) else _columns(value, start)
+            for name, value in series.items()}
+
+
+def make_delta(before: Optional[dict], before_times: Optional[np.ndarray],
+               after: dict, after_times: np.ndarray) -> Optional[dict]:
+    """
+    Delta message turning `before` into `after`, or None when a snapshot is needed.
+
+    Args:
+        before (dict): Previous market-data response (None if there is none).
+        before_times (np.ndarray): Open times of its candles.
+        after (dict): New market-data response.
+        after_times (np.ndarray): Open times of its candles.
+    """
+    n = len(after_times)
+    if before is None or len(before_times) != n or n == 0:
+        return None
+    # The previous forming candle locates the shift; the overlapping times must agree
+    idx = int(np.searchsorted(after_times, before_times[-1]))
+    if idx >= n or after_times[idx] != before_times[-1]:
+        return None
+    shift = n - 1 - idx
+    if not np.array_equal(before_times[shift:], after_times[:n - shift]):
+        return None
+
+    before_series, before_fields = _split(before, n)
+    after_series, after_fields = _split(after, n)
+    if _slice_series(before_series, n) != _slice_series(after_series, n):
+        return None  # Different set of series, e.g. an overlay appeared
+    start = _first_change(before_series, after_series, shift, n)
+    if start == 0:
+        return None
+    return {
+        "type": "delta",
+        "shift": shift,
+        "start": start,
+        "columns": _slice_series(after_series, start),
+        "fields": {name: value for name, value in after_fields.items() if before_fields.get(name) != value},
+    }
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=Config.STREAM_QUEUE_SIZE)
+        self.needs_snapshot = True
+
+
+class MarketStream:
+    """One shared market-data computation and the subscribers it pushes to."""
+
+    def __init__(self, compute: Callable[[], Tuple[dict, np.ndarray]], interval: float, counters: Dict[str, int]):
+        self.compute = compute
+        self.interval = interval
+        self.counters = counters
+        self.subscribers: Set[_Subscriber] = set()
+        self.source: Optional[dict] = None
+        self.snapshot: Optional[dict] = None
+        self.times: Optional[np.ndarray] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def _update(self):
+        """Recompute (in a worker thread) and build the delta from the last snapshot."""
+        source, times = self.compute()
+        if source is self.source:
+            return None  # Served from the response cache: nothing changed
+        response = to_jsonable(source)
+        return source, response, times, make_delta(self.snapshot, self.times, response, times)
+
+    async def run(self):
+        while True:
+            try:
+                update = await run_blocking('oanda', self._update)
+                if update is not None:
+                    self.source, self.snapshot, self.times, delta = update
+                    self._publish(delta)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._send_all({"type": "error", "message": str(e)})
+            await asyncio.sleep(self.interval)
+
+    def add(self) -> _Subscriber:
+        subscriber = _Subscriber()
+        self.subscribers.add(subscriber)
+        if self.snapshot is not None:
+            self._send_snapshot(subscriber)
+        return subscriber
+
+    def _send_snapshot(self, subscriber: _Subscriber):
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait({"type": "snapshot", "data": self.snapshot})
+        subscriber.needs_snapshot = False
+        self.counters["snapshots"] += 1
+
+    def _publish(self, delta: Optional[dict]):
+        for subscriber in self.subscribers:
+            if delta is None or subscriber.needs_snapshot or subscriber.queue.full():
+                # Slow subscribers skip the deltas they missed and resync from a snapshot
+                self._send_snapshot(subscriber)
+            else:
+                subscriber.queue.put_nowait(delta)
+                self.counters["deltas"] += 1
+
+    def _send_all(self, message: dict):
+        for subscriber in self.subscribers:
+            if not subscriber.queue.full():
+                subscriber.queue.put_nowait(message)
+
+
+class MarketStreams:
+    """Registry of MarketStream objects keyed by subscription; lives on the event loop."""
+
+    def __init__(self, interval: float = Config.STREAM_INTERVAL):
+        self.interval = interval
+        self._streams: Dict[tuple, MarketStream] = {}
+        self._counters = {"snapshots": 0, "deltas": 0}
+
+    @asynccontextmanager
+    async def subscribe(self, key: tuple, compute: Callable[[], Tuple[dict, np.ndarray]]):
+        """
+        Join the stream for key, starting it if needed; yields the message queue.
+
+        Args:
+            key (tuple): Subscription key; equal keys share one computation.
+            compute: Blocking callable returning (market-data response, candle open times).
+        """
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = MarketStream(compute, self.interval, self._counters)
+            stream.task = asyncio.create_task(stream.run())
+        subscriber = stream.add()
+        try:
+            yield subscriber.queue
+        finally:
+            stream.subscribers.discard(subscriber)
+            if not stream.subscribers:
+                stream.task.cancel()
+                del self._streams[key]
+
+    def stats(self) -> dict:
+        return {"streams": len(self._streams),
+                "subscribers": sum(len(s.subscribers) for s in self._streams.values()),
+                **self._counters}
+
+
+# Shared by all WebSocket connections
+market_streams = MarketStreams()
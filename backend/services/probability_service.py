@@ -2,9 +2,11 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
 from libs.tradelib import get_hist_prices, get_price
-from libs.indicators import calc_HA, zlema_ochl, calc_rsi, market_eff, zero_lag_trend_signals
+from libs.indicators import calc_HA, zlema_ochl, market_eff, zero_lag_trend_signals
+from libs.rolling import rolling_rsi
 from config import Config
 from .base_service import BaseService
+from .indicator_pipeline import IndicatorPipeline
 
 class ProbabilityService(BaseService):
     def __init__(self, exchange):
@@ -14,7 +16,8 @@ class ProbabilityService(BaseService):
     def get_service_name(self) -> str:
         return "ProbabilityService"
     
-    def calculate_signal_probabilities_from_chart_data(self, all_candles: List, median_values: np.ndarray, zl_signals: Dict, tp_pips: float = 5) -> Dict[str, Any]:
+    def calculate_signal_probabilities_from_chart_data(self, all_candles: List, median_values: np.ndarray, zl_signals: Dict, tp_pips: float = 5,
+                                                       pipeline: IndicatorPipeline = None) -> Dict[str, Any]:
         """Calculate probability using only the chart data that's already loaded"""
         try:
             if not all_candles or len(all_candles) == 0:
@@ -29,7 +32,7 @@ class ProbabilityService(BaseService):
             # For classic strategy, generate signals based on ZLEMA1 logic
             if zl_signals is None:
                 # Generate classic buy/sell signals using the logic from TradingChart.js
-                buy_signals, sell_signals = self._generate_classic_signals(all_candles, median_values)
+                buy_signals, sell_signals = self._generate_classic_signals(all_candles, median_values, pipeline)
                 
                 bull_prob = self._analyze_signal_probability(
                     base_data, median_values, buy_signals, 'BUY', tp_pips
@@ -63,23 +66,26 @@ class ProbabilityService(BaseService):
         except Exception as e:
             return self.handle_service_error(e, "calculate_signal_probabilities")
     
-    def _generate_classic_signals(self, all_candles: List, median_values: np.ndarray) -> tuple:
+    def _generate_classic_signals(self, all_candles: List, median_values: np.ndarray,
+                                  pipeline: IndicatorPipeline = None) -> tuple:
         """Generate buy/sell signals using classic ZLEMA1 strategy logic"""
-        from libs.indicators import calc_rsi
-        from config import Config
-        
         # Get base data
         base_data = all_candles[0]  # HA candles
         close_prices = base_data[1]  # Close prices
         low_prices = base_data[3]   # Low prices  
         high_prices = base_data[2]  # High prices
         
-        # Calculate RSI for all candle sets
-        rsi_data = [calc_rsi(candle[:4], Config.RSI_WINDOW) for candle in all_candles]
-        
-        # Calculate standard deviations
-        zlema_ohlc_data = np.concatenate([candle[:4] for candle in all_candles[1:]], axis=0)
-        std_devs = np.std(zlema_ohlc_data, axis=0)
+        if pipeline is not None:
+            # Reuse the RSI and standard deviations already computed for the chart
+            rsi_data = pipeline.rsi
+            std_devs = pipeline.std
+        else:
+            # Calculate RSI for all candle sets
+            rsi_data = rolling_rsi(np.stack([candle[:4] for candle in all_candles]), Config.RSI_WINDOW)
+            
+            # Calculate standard deviations
+            zlema_ohlc_data = np.concatenate([candle[:4] for candle in all_candles[1:]], axis=0)
+            std_devs = np.std(zlema_ohlc_data, axis=0)
         
         buy_signals = np.zeros(len(close_prices), dtype=bool)
         sell_signals = np.zeros(len(close_prices), dtype=bool)
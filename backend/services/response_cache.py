@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+from config import Config
+
+
+def candle_version(data: np.ndarray) -> tuple:
+    """
+    Identity of a candle window: its shape plus its first and last candles.
+
+    The last column holds the forming candle's time, OHLC and volume, so a new
+    candle or a tick that moves the forming one gives a new version.
+    """
+    return (data.shape,
+            data[:, 0].tobytes() if data.size else b'',
+            data[:, -1].tobytes() if data.size else b'')
+
+
+class ResponseCache:
+    """
+    Bounded LRU of finished endpoint responses.
+
+    Entries either live until evicted, for keys that already identify the
+    candles they were computed from (see candle_version), or carry a TTL, for
+    closed-candle views that stay valid until the next candle boundary. Cached
+    responses are shared between callers: do not mutate them.
+    """
+
+    def __init__(self, max_size: int = Config.RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached response for key, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store value, optionally expiring after ttl seconds."""
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, ttl)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses, "expired": self.expired}
+
+
+# Shared by all services
+response_cache = ResponseCache()
@@ -1,6 +1,7 @@
 import time
 from typing import List, Dict, Any, Optional
-from libs.tradelib import get_price, put_order, close_trade, get_balance, update_stats_dict
+from libs.candle_buffer import candle_buffers
+from libs.tradelib import put_order, close_trade, get_balance, update_stats_dict
 from config import Config
 from .base_service import BaseService
 
@@ -54,7 +55,7 @@ class TradingService(BaseService):
     def _place_practice_trade(self, pair: str, size: int, direction: str) -> Dict[str, Any]:
         """Place a simulated practice trade"""
         trade_id = f"practice_{direction.lower()}_{int(time.time())}"
-        current_price = get_price(pair, "M5", 1, self.exchange)[1, -1]
+        current_price = candle_buffers.get_price(pair, "M5", 1, self.exchange)[1, -1]
         
         self.open_trades.append({
             'trade_id': trade_id,
@@ -126,7 +127,7 @@ class TradingService(BaseService):
     
     def _calculate_trade_pl(self, trade: Dict[str, Any]) -> float:
         """Calculate current P&L for a trade"""
-        current_price = get_price(trade['pair'], 'M5', 1, self.exchange)[1, -1]
+        current_price = candle_buffers.get_price(trade['pair'], 'M5', 1, self.exchange)[1, -1]
         if trade['direction'] == 'BUY':
             return round((current_price - trade['entry_price']) * Config.PIP_MULTIPLIER, 2)
         else:  # SELL
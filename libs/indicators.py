@@ -130,6 +130,48 @@ def zlema_ochl_vectorized(ochl: np.ndarray, period: int) -> np.ndarray:
     
     return ema
 
+def zlema_ochl_multi(ochl: np.ndarray, periods) -> np.ndarray:
+    """
+    ZLEMA of OCHL data for several periods at once, identical to calling zlema_ochl per period.
+
+    The lag-adjusted inputs for every period are built with a single gather, and the
+    EMA recurrences run as lfilter calls over whole (4, N) blocks, one per distinct
+    smoothing factor, instead of a Python loop per period and column.
+
+    Args:
+        ochl (np.ndarray): Input OCHL data of shape (4, N).
+        periods (list[int]): ZLEMA periods.
+
+    Returns:
+        np.ndarray: ZLEMA values of shape (W, 4, N), in the order of `periods`.
+    """
+    if ochl.shape[0] != 4:
+        raise ValueError("Input array must have shape (4, N) corresponding to Open, Close, High, Low")
+
+    ochl = np.asarray(ochl, dtype=float)
+    periods = np.asarray(periods, dtype=int)
+    n = ochl.shape[1]
+    zl = np.zeros((len(periods), 4, n))
+    if n == 0 or len(periods) == 0:
+        return zl
+
+    lags = (periods - 1) // 2  # Lag correction factor per period
+    alphas = 2 / (periods + 1)  # EMA smoothing factor per period
+
+    # Adjusted price for every period: 2 * price[t] - price[t - lag] once t >= lag
+    lagged_idx = np.arange(n)[None, :] - lags[:, None]
+    lagged = np.moveaxis(ochl[:, np.maximum(lagged_idx, 0)], 0, 1)
+    price_adjusted = np.where((lagged_idx >= 0)[:, None, :], 2 * ochl - lagged, ochl)
+
+    zl[:, :, 0] = ochl[:, 0]
+    if n > 1:
+        for alpha in np.unique(alphas):
+            sel = alphas == alpha
+            zl[sel, :, 1:], _ = signal.lfilter([alpha], [1, -(1 - alpha)], price_adjusted[sel, :, 1:],
+                                               axis=-1, zi=np.broadcast_to((1 - alpha) * ochl[:, :1],
+                                                                           (sel.sum(), 4, 1)))
+    return zl
+
 #         #eff[n+winlen,  1]=np.mean(prices[VOLUME,n: n + winlen]) 
 #         #eff[n+winlen,  0]=prices[d_time,n] 
 #     eff = eff[:,1:]
@@ -172,14 +214,54 @@ def update_HA(HA, price):
 	return np.asarray([ha_open, ha_close, np.amax(elements),  np.amin(elements), price[VOLUME]  ] )
 
 def calc_HA(prices):
-	HA = np.zeros((5, prices.shape[1]))
-	HA[OPEN_PRICE,0] = prices[OPEN_PRICE,0]
-	HA[CLOSE_PRICE,0] = prices[CLOSE_PRICE,0] 	
-	HA[HIGH_PRICE,0] = prices[HIGH_PRICE,0]
-	HA[LOW_PRICE,0] = prices[LOW_PRICE,0]
-	for n in range(1, prices.shape[1]):
-		HA[:,n] =  update_HA(HA[:,n-1], prices[:,n])
-	return HA
+	return heikin_ashi(prices)
+
+def heikin_ashi(prices: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Heikin-Ashi candles, identical to iterating update_HA.
+
+    HA close is elementwise and HA open is the first-order recurrence
+    open[n] = (open[n-1] + close[n-1]) / 2, which is solved with lfilter so
+    there is no Python-level loop over candles.
+
+    Args:
+        prices (np.ndarray): Candles of shape (R, N) or a stack (P, R, N) with rows
+            in Open, Close, High, Low[, Volume, ...] order.
+
+    Returns:
+        np.ndarray: HA candles of shape (..., 5, N), or (..., 4, N) when the input
+            has no volume row. The first column holds the raw candle.
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_rows = 5 if prices.shape[-2] > VOLUME else 4
+    n = prices.shape[-1]
+    ha = np.zeros(prices.shape[:-2] + (n_rows, n))
+    if n == 0:
+        return ha
+
+    open_p = prices[..., OPEN_PRICE, :]
+    high_p = prices[..., HIGH_PRICE, :]
+    low_p = prices[..., LOW_PRICE, :]
+
+    ha_close = (open_p + prices[..., CLOSE_PRICE, :] + high_p + low_p) / 4
+    ha_close[..., 0] = prices[..., CLOSE_PRICE, 0]
+
+    ha_open = np.empty_like(ha_close)
+    ha_open[..., 0] = open_p[..., 0]
+    if n > 1:
+        # y[n] = 0.5 * close[n-1] + 0.5 * y[n-1], seeded with the first raw open
+        ha_open[..., 1:], _ = signal.lfilter([0.5], [1, -0.5], ha_close[..., :-1], axis=-1,
+                                             zi=0.5 * open_p[..., :1])
+
+    ha[..., OPEN_PRICE, :] = ha_open
+    ha[..., CLOSE_PRICE, :] = ha_close
+    ha[..., HIGH_PRICE, :] = np.maximum(np.maximum(high_p, low_p), np.maximum(ha_open, ha_close))
+    ha[..., LOW_PRICE, :] = np.minimum(np.minimum(high_p, low_p), np.minimum(ha_open, ha_close))
+    ha[..., HIGH_PRICE, 0] = high_p[..., 0]
+    ha[..., LOW_PRICE, 0] = low_p[..., 0]
+    if n_rows == 5:
+        ha[..., VOLUME, 1:] = prices[..., VOLUME, 1:]
+    return ha
 
 def update_rsi(HA):	
 	rs = HA[CLOSE_PRICE] - HA[OPEN_PRICE]
@@ -8,6 +8,7 @@ from oandapyV20.endpoints.instruments import InstrumentsCandles as get_prices
 from oandapyV20.endpoints.accounts import AccountInstruments, AccountSummary
 from oandapyV20.contrib.factories import InstrumentsCandlesFactory
 from datetime import datetime
+from operator import itemgetter
 import matplotlib.pyplot as plt
 from oandapyV20.endpoints import orders, positions
 
@@ -93,12 +94,20 @@ def connect(live_mode):
     return exchange, accountID
 
 def parse_prices(candles):
+	"""Parse OANDA candles into the 7-row array (Open, Close, High, Low, Volume, d_time, dow)."""
 	npdataset = np.zeros((7,len(candles)))
-	for i in range(len(candles)):
-		str_time = candles[i].get('time')[:19]
-		dow = datetime.strptime(str_time[:10], '%Y-%M-%d').weekday()
-		d_time = float(str_time[11:13]) + float(str_time[14:16])/100 +  float(str_time[17:19])/10000
-		npdataset[:,i] = np.array([candles[i].get('mid')['o'], candles[i].get('mid')['c'], candles[i].get('mid')['h'], candles[i].get('mid')['l'], candles[i].get('volume'), d_time, dow]).T
+	if not candles:
+		return npdataset
+	mid = itemgetter('o', 'c', 'h', 'l')
+	npdataset[:4] = np.array([mid(c['mid']) for c in candles], dtype=float).T
+	npdataset[4] = [c['volume'] for c in candles]
+
+	# Time of day as hh.mmss and weekday (Monday = 0; 1970-01-01 was a Thursday)
+	stamps = np.array([c['time'][:19] for c in candles], dtype='datetime64[s]')
+	days = stamps.astype('datetime64[D]')
+	secs = (stamps - days).astype(np.int64)
+	npdataset[5] = (secs // 3600).astype(float) + (secs // 60 % 60) / 100 + (secs % 60) / 10000
+	npdataset[6] = (days.astype(np.int64) + 3) % 7
 	return npdataset
 
 def get_price(instrument, frequency, last_n, exchange):
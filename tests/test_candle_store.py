@@ -0,0 +1,166 @@
+"""The candle store and the tradelib paths that read through it.
+
+Stored reads must return exactly what a direct download from the exchange
+returns, while requesting only the candles the store lacks.
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+from libs import tradelib
+from libs.candle_store import COLUMNS, TIME_COLUMN, CandleSeries
+from libs.fake_exchange import FakeExchange
+
+PAIR, GRAN = 'EUR_USD', 'M1'
+DAY0, DAY1, DAY2, DAY3 = (f'2025-06-0{d}T00:00:00Z' for d in range(1, 5))
+NOW = np.datetime64('2025-06-04T00:00:30', 's')  # The 00:00 candle is still forming
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return float(self.now.astype(np.int64))
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CANDLE_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _exchange(now=NOW):
+    return FakeExchange(clock=Clock(now))
+
+
+def _requests(exchange):
+    return exchange.stats()["requests"]
+
+
+def _series():
+    return tradelib.candle_store.default_store().series(PAIR, GRAN)
+
+
+def test_hist_end_is_exclusive_like_direct_download(store_dir):
+    direct_exchange, stored_exchange = _exchange(), _exchange()
+    direct = tradelib._download_hist_prices(PAIR, GRAN, direct_exchange, DAY1, DAY3)
+    stored = tradelib.get_hist_prices(PAIR, GRAN, stored_exchange, DAY1, DAY3)
+    assert direct.shape == stored.shape == (7, 2880)
+    np.testing.assert_array_equal(stored, direct)
+    # An empty store downloads just the requested range
+    assert _requests(stored_exchange) == _requests(direct_exchange)
+    assert _series().count == 2880
+
+
+def test_hist_repeat_is_served_from_store(store_dir):
+    exchange = _exchange()
+    first = tradelib.get_hist_prices(PAIR, GRAN, exchange, DAY1, DAY3)
+    before = _requests(exchange)
+    again = tradelib.get_hist_prices(PAIR, GRAN, exchange, '2025-06-02T12:00:00Z', '2025-06-03T12:00:00Z')
+    assert _requests(exchange) == before + 1  # Only the sync of newer candles
+    np.testing.assert_array_equal(again, first[:, 720:2160])
+
+
+def test_hist_without_end_includes_forming_candle(store_dir):
+    # Without an end the download runs up to the real present, so freeze the market there
+    now = np.datetime64(int(time.time()), 's')
+    start = np.datetime_as_string(now.astype('datetime64[m]') - np.timedelta64(1, 'D'), unit='s') + 'Z'
+    direct = tradelib._download_hist_prices(PAIR, GRAN, _exchange(now), start)
+    exchange = _exchange(now)
+    stored = tradelib.get_hist_prices(PAIR, GRAN, exchange, start)
+    np.testing.assert_array_equal(stored, direct)
+    assert stored.shape[1] == 1441
+    assert _series().count == 1440
+    np.testing.assert_array_equal(tradelib.get_hist_prices(PAIR, GRAN, exchange, start), direct)
+
+
+def test_hist_prefix_miss_fetches_only_older_candles(store_dir):
+    exchange = _exchange()
+    tradelib.get_hist_prices(PAIR, GRAN, exchange, DAY2, DAY3)
+    assert _series().count == 1440
+
+    before = _requests(exchange)
+    stored = tradelib.get_hist_prices(PAIR, GRAN, exchange, DAY1, DAY3)
+    # One chunk for [DAY1, DAY2) and one sync; the stored day is not downloaded again
+    assert _requests(exchange) == before + 2
+    np.testing.assert_array_equal(
+        stored, tradelib._download_hist_prices(PAIR, GRAN, _exchange(), DAY1, DAY3))
+    assert _series().count == 2880
+    assert _series().first_time() == np.datetime64('2025-06-02T00:00:00', 's')
+    assert np.all(np.diff(_series().times()) == np.timedelta64(60, 's'))
+
+
+def test_hist_before_stored_history_downloads_directly(store_dir):
+    exchange = _exchange()
+    tradelib.get_hist_prices(PAIR, GRAN, exchange, DAY2, DAY3)
+    stored = tradelib.get_hist_prices(PAIR, GRAN, exchange, DAY0, DAY2)
+    np.testing.assert_array_equal(
+        stored, tradelib._download_hist_prices(PAIR, GRAN, _exchange(), DAY0, DAY2))
+    assert _series().first_time() == np.datetime64('2025-06-03T00:00:00', 's')
+
+
+def test_get_price_syncs_only_new_candles(store_dir, monkeypatch):
+    clock = Clock(NOW)
+    exchange = FakeExchange(clock=clock)
+    prices, times = tradelib.get_price(PAIR, GRAN, 500, exchange, with_times=True)
+    assert _series().count == 499  # The forming candle is not stored
+
+    clock.now = NOW + np.timedelta64(10 * 60, 's')
+    before = _requests(exchange)
+    prices, times = tradelib.get_price(PAIR, GRAN, 500, exchange, with_times=True)
+    assert _requests(exchange) == before + 1
+    assert _series().count == 509
+
+    direct_exchange = FakeExchange(clock=Clock(clock.now))
+    monkeypatch.delenv("CANDLE_STORE_DIR")
+    direct_prices, direct_times = tradelib.get_price(PAIR, GRAN, 500, direct_exchange, with_times=True)
+    np.testing.assert_array_equal(prices, direct_prices)
+    np.testing.assert_array_equal(times, direct_times)
+
+
+def _filled_series(path, n=10):
+    series = CandleSeries(str(path))
+    times = np.datetime64('2025-06-02T00:00:00', 's') + np.arange(n) * np.timedelta64(60, 's')
+    series.append(np.arange(7 * n, dtype=float).reshape(7, n), times)
+    return series
+
+
+def test_append_skips_candles_already_stored(tmp_path):
+    series = _filled_series(tmp_path)
+    times = series.times()[-3:] + np.timedelta64(120, 's')
+    assert series.append(np.ones((7, 3)), times) == 2
+    assert series.count == 12
+    np.testing.assert_array_equal(series.tail(2), np.ones((7, 2)))
+
+
+def test_prepend_keeps_stored_candles(tmp_path):
+    series = _filled_series(tmp_path)
+    stored = series.read()
+    older = series.first_time() - np.arange(3, 0, -1) * np.timedelta64(60, 's')
+    assert series.prepend(np.full((7, 3), -1.0), older) == 3
+    assert series.count == 13
+    np.testing.assert_array_equal(series.read(3), stored)
+    np.testing.assert_array_equal(series.times()[:3], older)
+
+
+def test_recover_trims_uncommitted_columns(tmp_path):
+    series = _filled_series(tmp_path)
+    expected = series.read()
+    # An append interrupted before the time column was written
+    with open(series._file(COLUMNS[0]), 'ab') as f:
+        f.write(np.zeros(4).tobytes())
+    reopened = CandleSeries(str(tmp_path))
+    assert reopened.count == 10
+    assert os.path.getsize(reopened._file(COLUMNS[0])) == 10 * 8
+    np.testing.assert_array_equal(reopened.read(), expected)
+
+
+def test_recover_resets_on_missing_data(tmp_path):
+    series = _filled_series(tmp_path)
+    with open(series._file(COLUMNS[-1]), 'r+b') as f:
+        f.truncate(5 * 8)
+    reopened = CandleSeries(str(tmp_path))
+    assert reopened.count == 0
+    assert os.path.getsize(reopened._file(TIME_COLUMN)) == 0
@@ -3,7 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mplfinance.original_flavor import candlestick2_ohlc
 from libs.tradelib import connect, get_price, OPEN_PRICE, CLOSE_PRICE, HIGH_PRICE, LOW_PRICE, PIP, put_order, close_trade, get_hist_prices
-from libs.indicators import calc_HA, zlema_ochl,  market_eff_win, calc_rsi
+from libs.indicators import calc_HA, zlema_ochl_multi,  market_eff_win, calc_rsi
 import time
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -54,7 +54,7 @@ def is_market_open():
 @st.cache_data
 def calc_multiple_zlema(candles, window_lengths):
     """Calculate ZLEMA for multiple window lengths"""
-    zlema_results = [zlema_ochl(candles[:4], window) for window in window_lengths]
+    zlema_results = list(zlema_ochl_multi(candles[:4], window_lengths))
     return zlema_results
 
 